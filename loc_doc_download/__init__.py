@@ -0,0 +1,7 @@
+"""
+Download Library of Congress newspaper pages and extract their text.
+
+Importing the package does not import any of its modules; import the ones you need, e.g.
+`from loc_doc_download.download_api import download_newspaper_pages_api`. The command line is in cli.py:
+`python -m loc_doc_download download|transcribe|status ...`.
+"""
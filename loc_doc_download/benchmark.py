@@ -0,0 +1,260 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+import argparse
+import tempfile
+import re
+import threading
+import random
+import shutil
+import hashlib
+import json
+import time
+
+from . import timing
+from .download_api import download_newspaper_pages_api
+from .scheduler import DownloadScheduler
+
+# LCCN of the fake newspaper served by the mock server
+MOCK_LCCN = "sn00000001"
+
+
+def make_mock_pdf(size):
+    """
+    Builds a well-formed PDF of roughly the given size.
+
+    Args:
+        size (int): The size of the PDF in bytes.
+
+    Returns:
+        bytes: The PDF.
+    """
+    header = b"%PDF-1.4\n"
+    trailer = b"\n%%EOF\n"
+    return header + b"%" + b"0" * max(0, size - len(header) - len(trailer) - 1) + trailer
+
+
+def make_mock_alto(words):
+    """
+    Builds an ALTO XML page with the given number of words, laid out in four columns.
+
+    Args:
+        words (int): The number of String elements.
+
+    Returns:
+        bytes: The ALTO XML.
+    """
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<alto xmlns="http://www.loc.gov/standards/alto/ns-v2#">'
+             '<Description><MeasurementUnit>pixel</MeasurementUnit></Description>'
+             '<Layout><Page ID="P1" WIDTH="5000" HEIGHT="7000"><PrintSpace>']
+    words_per_line, lines_per_block = 8, 10
+    for block in range(max(1, words // (words_per_line * lines_per_block))):
+        left, top = (block % 4) * 1250 + 50, (block // 4) * 450 + 50
+        parts.append(f'<TextBlock ID="B{block}" HPOS="{left}" VPOS="{top}" WIDTH="1150" HEIGHT="420">')
+        for line in range(lines_per_block):
+            parts.append(f'<TextLine HPOS="{left}" VPOS="{top + line * 40}" WIDTH="1150" HEIGHT="36">')
+            for word in range(words_per_line):
+                parts.append(f'<String CONTENT="word{block}.{line}.{word}" HPOS="{left + word * 140}" '
+                             f'VPOS="{top + line * 40}" WIDTH="130" HEIGHT="36" WC="0.{random.randint(50, 99)}"/><SP/>')
+            parts.append('</TextLine>')
+        parts.append('</TextBlock>')
+    parts.append('</PrintSpace></Page></Layout></alto>')
+    return "".join(parts).encode("utf-8")
+
+
+class MockLocHandler(BaseHTTPRequestHandler):
+    """
+    Serves the parts of loc.gov used by the downloaders: the collection search, item JSON, and page PDF and ALTO files.
+    Files support byte-range requests. Responses carry an ETag, and conditional requests are answered with 304 Not Modified.
+    The server attributes (dates, pages, latency, error_rate, pdf, alto) configure the responses.
+    Errors are injected into item and file requests only, so that every run gets past listing the issues.
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_not_modified(self, etag):
+        """
+        Answers with 304 Not Modified if the request's If-None-Match matches the ETag.
+
+        Returns:
+            bool: Whether the response was sent.
+        """
+        if self.headers.get("If-None-Match") != etag:
+            return False
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.end_headers()
+        return True
+
+    def send_body(self, body, content_type, status=200):
+        etag = make_etag(body)
+        if status == 200 and self.send_not_modified(etag):
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_file(self, body, content_type, etag):
+        """
+        Sends a file, or the byte range of it asked for in a Range header.
+        """
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if not match and self.send_not_modified(etag):
+            return
+        if not match:
+            self.send_response(200)
+            self.send_header("Accept-Ranges", "bytes")
+        else:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or len(body) - 1), len(body) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+            body = body[start:end + 1]
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client switched to range requests after reading the headers
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        base_url = f"http://{self.headers.get('Host')}"
+        parts = [part for part in url.path.split("/") if part]
+
+        time.sleep(server.latency)
+        if parts[:1] in (["item"], ["files"]) and random.random() < server.error_rate:
+            self.send_response(503)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if parts[:2] == ["collections", "chronicling-america"]:
+            results = [{"id": f"{base_url}/item/{MOCK_LCCN}/{date}/ed-1/", "date": date} for date in server.dates]
+            body = {"results": results, "pagination": {"next": None}}
+            self.send_body(json.dumps(body).encode("utf-8"), "application/json")
+        elif parts[:1] == ["item"] and len(parts) == 4:
+            date = parts[2]
+            files = [[{"mimetype": "application/pdf", "url": f"{base_url}/files/{date}/{page}.pdf"},
+                      {"mimetype": "text/xml", "url": f"{base_url}/files/{date}/{page}.xml"}]
+                     for page in range(1, server.pages + 1)]
+            body = {"item": {"title": f"Mock Gazette, {date}", "newspaper_title": ["Mock Gazette (Benchmark, Tenn.) 1900-1901"],
+                             "date": date, "language": ["english"]},
+                    "resources": [{"files": files}]}
+            self.send_body(json.dumps(body).encode("utf-8"), "application/json")
+        elif parts[:1] == ["files"] and url.path.endswith(".pdf"):
+            self.send_file(server.pdf, "application/pdf", server.pdf_etag)
+        elif parts[:1] == ["files"] and url.path.endswith(".xml"):
+            self.send_file(server.alto, "text/xml", server.alto_etag)
+        else:
+            self.send_body(b"Not found", "text/plain", status=404)
+
+
+def make_etag(body):
+    return '"' + hashlib.md5(body).hexdigest() + '"'
+
+
+def start_mock_server(issues=5, pages=8, latency=0.05, error_rate=0.0, pdf_size=2_000_000, alto_words=4000):
+    """
+    Starts a mock loc.gov server on a free local port, in a background thread.
+
+    Args:
+        issues (int, optional): The number of issues of the mock newspaper. Defaults to 5.
+        pages (int, optional): The number of pages per issue. Defaults to 8.
+        latency (float, optional): The delay added to every response, in seconds. Defaults to 0.05.
+        error_rate (float, optional): The fraction of item and file requests answered with 503. Defaults to 0.0.
+        pdf_size (int, optional): The size of each page PDF in bytes. Defaults to 2,000,000.
+        alto_words (int, optional): The number of words of each ALTO page. Defaults to 4000.
+
+    Returns:
+        ThreadingHTTPServer: The running server. Its base URL is http://127.0.0.1:<server_port>. Call shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockLocHandler)
+    server.daemon_threads = True
+    server.dates = [f"1900-{1 + index // 28:02d}-{1 + index % 28:02d}" for index in range(issues)]
+    server.pages = pages
+    server.latency = latency
+    server.error_rate = error_rate
+    server.pdf = make_mock_pdf(pdf_size)
+    server.alto = make_mock_alto(alto_words)
+    server.pdf_etag = make_etag(server.pdf)
+    server.alto_etag = make_etag(server.alto)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_benchmark(engine="api", issues=5, pages=8, latency=0.05, error_rate=0.0, pdf_size=2_000_000,
+                  workers=8, requests_per_second=0, timings_path=None, keep_downloads=False, range_parts=0):
+    """
+    Runs a downloader against a mock loc.gov server and reports stage timings and throughput.
+
+    Args:
+        engine (str, optional): 'api' for download_api.download_newspaper_pages_api, 'scheduler' for scheduler.download_titles. Defaults to 'api'.
+        issues, pages, latency, error_rate, pdf_size: The mock server settings, see start_mock_server.
+        workers (int, optional): The number of concurrent downloads (api) or issues (scheduler). Defaults to 8.
+        requests_per_second (float, optional): The request rate cap; 0 disables it. Defaults to 0.
+        timings_path (str, optional): A file to which stage timings are appended as JSON lines. Defaults to None.
+        keep_downloads (bool, optional): Whether to keep the downloaded files. Defaults to False.
+        range_parts (int, optional): The number of parallel byte-range requests per large PDF (api engine); 0 disables them. Defaults to 0.
+
+    Returns:
+        dict: The timing summary, see timing.StageTimer.summary.
+    Comments:
+        The browser engines (download_pages.py, browser_pool.py) are not supported: the mock server serves the JSON API
+        and the page files, but not the viewer pages that Chrome navigates.
+    """
+    server = start_mock_server(issues, pages, latency, error_rate, pdf_size)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    downloads_root = tempfile.mkdtemp(prefix="loc-benchmark-")
+
+    timing.timer.reset(timings_path)
+    try:
+        first_issue_url = f"{base_url}/resource/{MOCK_LCCN}/{server.dates[0]}/ed-1/?sp=1&st=image"
+        if engine == "api":
+            download_newspaper_pages_api(first_issue_url, downloads_root, base_url=base_url,
+                                         max_workers=workers, requests_per_second=requests_per_second,
+                                         range_parts=range_parts)
+        elif engine == "scheduler":
+            with DownloadScheduler(downloads_root, workers, requests_per_second, base_url=base_url) as runner:
+                runner.add_title(first_issue_url)
+                runner.run()
+        else:
+            raise ValueError(f"Unknown engine: {engine}")
+        return timing.timer.summary()
+    finally:
+        server.shutdown()
+        if keep_downloads:
+            print(f"Downloads kept in {downloads_root}")
+        else:
+            shutil.rmtree(downloads_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the downloaders against a mock loc.gov server.")
+    parser.add_argument("--engine", choices=["api", "scheduler"], default="api")
+    parser.add_argument("--issues", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--pdf-size", type=int, default=2_000_000, help="Size of each page PDF in bytes")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--requests-per-second", type=float, default=0, help="Request rate cap, 0 to disable")
+    parser.add_argument("--timings", help="Append stage timings to this JSON lines file")
+    parser.add_argument("--seed", type=int, help="Random seed of the injected errors")
+    parser.add_argument("--range-parts", type=int, default=0, help="Parallel byte-range requests per large PDF (api engine)")
+    parser.add_argument("--keep-downloads", action="store_true")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    summary = run_benchmark(args.engine, args.issues, args.pages, args.latency, args.error_rate, args.pdf_size,
+                            args.workers, args.requests_per_second, args.timings, args.keep_downloads, args.range_parts)
+    print(json.dumps(summary, indent=4))
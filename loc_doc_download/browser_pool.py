@@ -0,0 +1,202 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import threading
+import queue
+import os
+
+from .download_pages import setup_chrome_options, download_issue_in_browser
+from .download_api import list_issues, parse_issue_url, build_resource_url, get_issue_key, LOC_BASE_URL
+from .fetcher import ConcurrentFetcher, RateLimiter, create_session, DEFAULT_REQUESTS_PER_SECOND
+from .manifest import Manifest, MANIFEST_FILENAME
+from .timing import timer
+
+# Default number of browsers, and so of issues downloaded at the same time
+DEFAULT_POOL_SIZE = 3
+
+# Number of concurrent OCR(ALTO) downloads per issue
+ALTO_WORKERS_PER_ISSUE = 2
+
+# Requests the viewer page makes that are not needed to download files: page images, fonts and analytics
+BLOCKED_URL_PATTERNS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico", "*.jp2",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*tile.loc.gov/image-services/*",
+    "*google-analytics.com*", "*googletagmanager.com*",
+]
+
+
+def create_driver(download_folder, headless=True, blocked_url_patterns=BLOCKED_URL_PATTERNS):
+    """
+    Starts a Chrome browser set up for downloading files.
+
+    Args:
+        download_folder (str): The initial download folder. Use download_pages.set_download_directory to change it.
+        headless (bool, optional): Whether to run Chrome without a window. Defaults to True.
+        blocked_url_patterns (list, optional): URL patterns the browser does not load. Defaults to BLOCKED_URL_PATTERNS.
+
+    Returns:
+        WebDriver: The Chrome WebDriver instance.
+    """
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--window-size=1280,1024")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options = setup_chrome_options(chrome_options, download_folder)
+
+    driver = webdriver.Chrome(options=chrome_options)
+    if blocked_url_patterns:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_url_patterns})
+    return driver
+
+
+class BrowserPool:
+    """
+    A pool of long-lived Chrome browsers shared between worker threads.
+
+    Args:
+        size (int, optional): The maximum number of browsers. Defaults to DEFAULT_POOL_SIZE.
+        download_folder (str, optional): The initial download folder of the browsers. Defaults to ./downloads.
+        headless (bool, optional): Whether to run Chrome without a window. Defaults to True.
+        blocked_url_patterns (list, optional): URL patterns the browsers do not load. Defaults to BLOCKED_URL_PATTERNS.
+    Comments:
+        Browsers are started on first use and reused afterwards; the download folder is switched at runtime
+        instead of restarting the browser. A browser that fails with a WebDriverException is discarded,
+        and a new one is started the next time one is needed. After any other exception, the browser is returned to the pool.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, download_folder=None, headless=True, blocked_url_patterns=BLOCKED_URL_PATTERNS):
+        self.size = size
+        self.download_folder = download_folder or os.path.join(os.getcwd(), "downloads")
+        self.headless = headless
+        self.blocked_url_patterns = blocked_url_patterns
+        self.available = queue.Queue()
+        self.started = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        """
+        Borrows a browser from the pool, starting one if the pool is not full yet.
+
+        Yields:
+            WebDriver: The Chrome WebDriver instance.
+        """
+        driver = None
+        try:
+            driver = self.available.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                start_new = self.started < self.size
+                if start_new:
+                    self.started += 1
+            if start_new:
+                try:
+                    driver = create_driver(self.download_folder, self.headless, self.blocked_url_patterns)
+                except Exception:
+                    with self.lock:
+                        self.started -= 1
+                    raise
+            else:
+                driver = self.available.get()
+
+        # Whatever happens, the browser goes back to the pool, or is discarded if it failed
+        healthy = True
+        try:
+            yield driver
+        except WebDriverException:
+            healthy = False
+            raise
+        finally:
+            if healthy:
+                self.available.put(driver)
+            else:
+                self.discard(driver)
+
+    def discard(self, driver):
+        with self.lock:
+            self.started -= 1
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                driver = self.available.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def download_newspaper_pages_parallel(url, pool_size=DEFAULT_POOL_SIZE, end_date=None, downloads_root=None,
+                                      base_url=LOC_BASE_URL, requests_per_second=DEFAULT_REQUESTS_PER_SECOND, cache=None):
+    """
+    Downloads newspaper pages in several headless browsers at once, one issue per browser.
+
+    Args:
+        url (str): The URL of the first issue to download (any resource or item URL of the issue).
+        pool_size (int, optional): The number of browsers, and so of issues downloaded at the same time. Defaults to DEFAULT_POOL_SIZE.
+        end_date (str, optional): The last issue date to download, formatted as YYYY-MM-DD. Defaults to None.
+        downloads_root (str, optional): The root folder of the downloads. Defaults to ./downloads.
+        base_url (str, optional): The base URL of the site. Defaults to LOC_BASE_URL.
+        requests_per_second (float, optional): The maximum number of requests per second of the OCR(ALTO) downloads. Defaults to DEFAULT_REQUESTS_PER_SECOND.
+        cache (ResponseCache, optional): A cache for the HTTP responses (issue lists, item JSON, ALTO files), see http_cache.py. Defaults to None.
+
+    Returns:
+        None
+    Comments:
+        The issues are listed up front from the loc.gov JSON API instead of clicking "Next issue".
+        Issues the manifest records as complete are skipped.
+    """
+    if downloads_root is None:
+        downloads_root = os.path.join(os.getcwd(), "downloads")
+    os.makedirs(downloads_root, exist_ok=True)
+
+    lccn, start_date, _ = parse_issue_url(url)
+    timer.restart()
+    rate_limiter = RateLimiter(requests_per_second)
+    with create_session(cache=cache) as session:
+        issue_urls = list_issues(session, lccn, start_date, end_date, base_url, rate_limiter)
+    print(f"Found {len(issue_urls)} issues of {lccn}")
+
+    resource_urls = []
+    for issue_url in issue_urls:
+        issue_lccn, date, edition = parse_issue_url(issue_url)
+        resource_urls.append(build_resource_url(issue_lccn, date, edition, base_url))
+
+    with Manifest(os.path.join(downloads_root, MANIFEST_FILENAME)) as manifest, \
+            BrowserPool(pool_size, downloads_root) as pool:
+
+        def download_issue(resource_url):
+            if manifest.is_issue_complete(get_issue_key(resource_url)):
+                print(f"Skipping {resource_url}, already downloaded")
+                return True
+            try:
+                with pool.acquire() as driver, \
+                        ConcurrentFetcher(ALTO_WORKERS_PER_ISSUE, rate_limiter=rate_limiter, cache=cache) as fetcher:
+                    return download_issue_in_browser(driver, resource_url, manifest, fetcher, downloads_root)
+            except WebDriverException as e:
+                print(f"Browser error while downloading {resource_url}: {str(e)}")
+                return False
+            except Exception as e:
+                # One broken issue (e.g. an unparsable page or a failed write) must not abort the other issues
+                print(f"An error occurred while downloading {resource_url}: {e!r}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="browser") as executor:
+            results = list(executor.map(download_issue, resource_urls))
+
+    print(f"Downloaded {sum(results)} of {len(resource_urls)} issues completely")
+    timer.print_summary()
@@ -0,0 +1,218 @@
+import argparse
+import sys
+import os
+
+# Modules are imported inside the commands that use them, so that e.g. `status` does not load Selenium, NumPy or pdf2image.
+
+# Default root folder of the downloads
+DEFAULT_DOWNLOADS_ROOT = "downloads"
+
+# Suffixes of the page files counted by the status command
+PAGE_FILE_SUFFIXES = {".pdf": "pdf", ".xml": "alto", "_ocr.txt": "text"}
+
+
+def download(args):
+    """
+    Downloads the newspapers given on the command line with the chosen engine.
+    HTTP responses are cached in the downloads folder unless --no-cache is given.
+    """
+    cache = open_cache(args)
+    try:
+        download_with_engine(args, cache)
+    finally:
+        if cache:
+            summary = cache.summary()
+            cache.close()
+            print(f"HTTP cache: {summary['hits']} hits, {summary['revalidated']} revalidated, {summary['misses']} misses, "
+                  f"{summary['entries']} responses ({summary['bytes'] / 1e6:.1f} MB)")
+    return 0
+
+
+def open_cache(args):
+    """
+    Opens the HTTP response cache chosen on the command line, or returns None with --no-cache.
+    """
+    if args.no_cache:
+        return None
+    from .http_cache import ResponseCache, CACHE_FOLDERNAME
+    return ResponseCache(os.path.join(args.downloads, CACHE_FOLDERNAME), int(args.cache_size * 1024 * 1024),
+                         offline=args.offline, max_age=args.cache_max_age)
+
+
+def download_with_engine(args, cache):
+    if args.transcribe:
+        from .pipeline import download_and_transcribe
+        for url in args.urls:
+            download_and_transcribe(url, args.engine, args.downloads, args.transcribe_workers, reorder=not args.no_reorder,
+                                    cache=cache, end_date=args.end_date, download_workers=args.workers,
+                                    requests_per_second=args.requests_per_second, range_parts=args.range_parts)
+    elif args.engine == "api":
+        from .download_api import download_newspaper_pages_api
+        for url in args.urls:
+            download_newspaper_pages_api(url, args.downloads, args.end_date, max_workers=args.workers,
+                                         requests_per_second=args.requests_per_second, range_parts=args.range_parts,
+                                         cache=cache)
+    elif args.engine == "scheduler":
+        from .scheduler import download_titles
+        download_titles(args.urls, args.downloads, args.workers, args.requests_per_second, cache=cache)
+    elif args.engine == "parallel":
+        from .browser_pool import download_newspaper_pages_parallel
+        for url in args.urls:
+            download_newspaper_pages_parallel(url, args.workers, args.end_date, args.downloads,
+                                              requests_per_second=args.requests_per_second, cache=cache)
+    else:
+        from .download_pages import download_newspaper_pages
+        for url in args.urls:
+            download_newspaper_pages(url, cache=cache)
+
+
+def transcribe(args):
+    """
+    Transcribes the downloaded pages of the publications given on the command line.
+    """
+    for publication_path in args.paths:
+        if not os.path.isdir(publication_path):
+            print(f"Error: {publication_path} is not a valid directory.")
+            return 1
+
+    from .transcribe_pages import extract_all_text_from_alto
+    for publication_path in args.paths:
+        extract_all_text_from_alto(publication_path, args.workers, args.force, args.index, reorder=not args.no_reorder,
+                                   ocr=args.ocr, ocr_dpi=args.ocr_dpi, min_confidence=args.min_confidence,
+                                   ocr_language=args.ocr_language)
+    return 0
+
+
+def count_page_files(downloads_root):
+    """
+    Counts the page files of every publication in a downloads folder.
+
+    Args:
+        downloads_root (str): The root folder of the downloads.
+
+    Returns:
+        dict: For each publication folder, the number of issues and of 'pdf', 'alto' and 'text' page files.
+    """
+    counts = {}
+    for publication in sorted(os.scandir(downloads_root), key=lambda entry: entry.name):
+        if not publication.is_dir():
+            continue
+        publication_counts = {"issues": 0, "pdf": 0, "alto": 0, "text": 0}
+        for issue in os.scandir(publication.path):
+            if not issue.is_dir():
+                continue
+            publication_counts["issues"] += 1
+            for entry in os.scandir(issue.path):
+                if entry.name.startswith("page_"):
+                    for suffix, kind in PAGE_FILE_SUFFIXES.items():
+                        if entry.name.endswith(suffix):
+                            publication_counts[kind] += 1
+                            break
+        counts[publication.name] = publication_counts
+    return counts
+
+
+def status(args):
+    """
+    Prints the state of the downloads recorded in the manifest, the page files on disk and the size of the search index.
+    """
+    from .manifest import Manifest, MANIFEST_FILENAME
+    from .search_index import INDEX_FILENAME
+    import sqlite3
+
+    downloads_root = args.downloads
+    if not os.path.isdir(downloads_root):
+        print(f"Error: {downloads_root} is not a valid directory.")
+        return 1
+
+    manifest_path = os.path.join(downloads_root, MANIFEST_FILENAME)
+    if os.path.exists(manifest_path):
+        with Manifest(manifest_path) as manifest:
+            summary = manifest.summary()
+        for kind in ("issues", "files"):
+            states = ", ".join(f"{count} {state}" for state, count in sorted(summary[kind].items())) or "none"
+            print(f"{kind.capitalize()}: {states}")
+    else:
+        print("No manifest: nothing was downloaded here yet")
+
+    for publication, counts in count_page_files(downloads_root).items():
+        print(f"{publication}: {counts['issues']} issues, {counts['pdf']} PDFs, {counts['alto']} ALTO files, "
+              f"{counts['text']} transcribed pages")
+
+    index_path = os.path.join(downloads_root, INDEX_FILENAME)
+    if os.path.exists(index_path):
+        connection = sqlite3.connect(index_path)
+        try:
+            print(f"Search index: {connection.execute('SELECT COUNT(*) FROM documents').fetchone()[0]} pages")
+        finally:
+            connection.close()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="loc-doc-download",
+                                     description="Download and transcribe Library of Congress newspaper pages.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    download_parser = commands.add_parser("download", help="Download newspaper pages")
+    download_parser.add_argument("urls", nargs="+", metavar="URL",
+                                 help="URL of the first issue to download, or a title (LCCN[:start[:end]]) with --engine scheduler")
+    download_parser.add_argument("--engine", choices=["api", "scheduler", "parallel", "browser"], default="api",
+                                 help="api: loc.gov JSON API (default); scheduler: several titles with retries; "
+                                      "parallel: a pool of headless browsers; browser: one Chrome window")
+    download_parser.add_argument("--downloads", default=DEFAULT_DOWNLOADS_ROOT, help="Root folder of the downloads (default: ./downloads)")
+    download_parser.add_argument("--end-date", help="Last issue date to download (YYYY-MM-DD; api and parallel engines)")
+    download_parser.add_argument("--workers", type=int, default=4, help="Concurrent downloads, issues or browsers")
+    download_parser.add_argument("--requests-per-second", type=float, default=4.0, help="Request rate cap per host")
+    download_parser.add_argument("--range-parts", type=int, default=0, help="Parallel byte-range requests per large PDF (api engine)")
+    download_parser.add_argument("--transcribe", action="store_true", help="Transcribe pages as they are downloaded")
+    download_parser.add_argument("--transcribe-workers", type=int, help="Transcription processes (default: one per core)")
+    download_parser.add_argument("--no-reorder", action="store_true", help="Keep the blocks of each page in document order")
+    download_parser.add_argument("--no-cache", action="store_true", help="Do not cache HTTP responses")
+    download_parser.add_argument("--offline", action="store_true", help="Serve every request from the HTTP cache, without network access")
+    download_parser.add_argument("--cache-size", type=float, default=1024, help="Maximum size of the HTTP cache in MB (default: 1024)")
+    download_parser.add_argument("--cache-max-age", type=float, default=0,
+                                 help="Seconds during which cached responses are used without revalidation (default: 0)")
+    download_parser.set_defaults(handler=download)
+
+    transcribe_parser = commands.add_parser("transcribe", help="Extract the text of downloaded pages")
+    transcribe_parser.add_argument("paths", nargs="+", metavar="PATH", help="Folder of a publication, e.g. downloads/<title>")
+    transcribe_parser.add_argument("--workers", type=int, help="Transcription processes (default: one per core)")
+    transcribe_parser.add_argument("--force", action="store_true", help="Transcribe pages that are already up to date")
+    transcribe_parser.add_argument("--index", help="Path of the search index (default: search_index.sqlite next to the publication)")
+    transcribe_parser.add_argument("--no-reorder", action="store_true", help="Keep the blocks of each page in document order")
+    transcribe_parser.add_argument("--ocr", action="store_true",
+                                   help="Transcribe pages without ALTO, or with low ALTO word confidence, with Tesseract")
+    transcribe_parser.add_argument("--ocr-dpi", type=int, default=300, help="Resolution at which pages are rasterized for Tesseract (default: 300)")
+    transcribe_parser.add_argument("--min-confidence", type=float, default=0.5,
+                                   help="Mean ALTO word confidence (0 to 1) below which pages are transcribed with Tesseract (default: 0.5)")
+    transcribe_parser.add_argument("--ocr-language", default="eng", help="Tesseract language (default: eng)")
+    transcribe_parser.set_defaults(handler=transcribe)
+
+    status_parser = commands.add_parser("status", help="Summarize the downloads and transcriptions")
+    status_parser.add_argument("--downloads", default=DEFAULT_DOWNLOADS_ROOT, help="Root folder of the downloads (default: ./downloads)")
+    status_parser.set_defaults(handler=status)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "download":
+        if args.transcribe and args.engine == "parallel":
+            parser.error("--transcribe works with the api, scheduler and browser engines")
+        if args.end_date and args.engine in ("scheduler", "browser"):
+            parser.error(f"--end-date is not supported by the {args.engine} engine"
+                         + (": give the range in the title, e.g. LCCN:start:end" if args.engine == "scheduler" else ""))
+        if args.range_parts and args.engine != "api":
+            parser.error("--range-parts is only supported by the api engine")
+        if args.offline and args.no_cache:
+            parser.error("--offline needs the HTTP cache")
+        if args.engine == "browser":
+            args.downloads = DEFAULT_DOWNLOADS_ROOT  # download_pages.py always saves to ./downloads
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+from urllib.parse import urlsplit
+import requests
+import os
+import re
+import json
+
+from .fetcher import (ConcurrentFetcher, DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, THROTTLE_STATUS_CODES, parse_retry_after,
+                      is_transient_failure)
+from .manifest import Manifest, MANIFEST_FILENAME
+from .timing import stage, timer
+from .utils import sanitize_filename
+
+# Base URL of the loc.gov site. Point this at a local stand-in server to test against recorded responses.
+LOC_BASE_URL = "https://www.loc.gov"
+
+# URL of the first page of the first issue of the newspaper downloaded when a script is run directly
+newspaper_url = "https://www.loc.gov/resource/sn96086912/1882-10-07/ed-1/?sp=1&st=image"
+
+# Matches resource and item URLs such as https://www.loc.gov/resource/sn96086912/1882-10-07/ed-1/?sp=1&st=image
+ISSUE_URL_PATTERN = re.compile(r"/(?:resource|item)/(?P<lccn>[a-z]*\d+)/(?P<date>\d{4}-\d{2}-\d{2})/(?P<edition>ed-\d+)")
+
+# Number of search results requested per page when listing the issues of a title
+ISSUES_PER_PAGE = 160
+
+
+class SiteError(Exception):
+    """
+    Raised when loc.gov is overloaded, throttling us, or serves its "technical difficulties" page instead of JSON.
+
+    Args:
+        message (str): A description of the error.
+        retry_after (float, optional): The number of seconds the server asked us to wait. Defaults to None.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_issue_url(url):
+    """
+    Parses a loc.gov resource or item URL into its LCCN, issue date and edition.
+
+    Args:
+        url (str): A resource or item URL of a newspaper issue.
+
+    Returns:
+        tuple: The (lccn, date, edition) of the issue.
+
+    Raises:
+        ValueError: If the URL does not point to a newspaper issue.
+    """
+    match = ISSUE_URL_PATTERN.search(url)
+    if not match:
+        raise ValueError(f"Not a loc.gov newspaper issue URL: {url}")
+    return match.group("lccn"), match.group("date"), match.group("edition")
+
+
+def build_issue_url(lccn, date, edition, base_url=LOC_BASE_URL):
+    """
+    Builds the item URL of a newspaper issue.
+
+    Args:
+        lccn (str): The LCCN of the newspaper title.
+        date (str): The issue date, formatted as YYYY-MM-DD.
+        edition (str): The edition of the issue, e.g. 'ed-1'.
+        base_url (str, optional): The base URL of the site. Defaults to LOC_BASE_URL.
+
+    Returns:
+        str: The item URL of the issue.
+    """
+    return f"{base_url}/item/{lccn}/{date}/{edition}/"
+
+
+def build_resource_url(lccn, date, edition, base_url=LOC_BASE_URL):
+    """
+    Builds the URL of the first page of an issue in the loc.gov viewer, as opened by the browser engines.
+
+    Args:
+        lccn (str): The LCCN of the newspaper title.
+        date (str): The issue date, formatted as YYYY-MM-DD.
+        edition (str): The edition of the issue, e.g. 'ed-1'.
+        base_url (str, optional): The base URL of the site. Defaults to LOC_BASE_URL.
+
+    Returns:
+        str: The resource URL of the first page of the issue.
+    """
+    return f"{base_url}/resource/{lccn}/{date}/{edition}/?sp=1&st=image"
+
+
+def get_issue_key(url):
+    """
+    Gets the key under which an issue is recorded in the manifest: its item URL, whichever engine downloads it.
+
+    Args:
+        url (str): Any resource or item URL of the issue.
+
+    Returns:
+        str: The item URL of the issue, on the site of the given URL.
+
+    Raises:
+        ValueError: If the URL does not point to a newspaper issue.
+    """
+    parts = urlsplit(url)
+    return build_issue_url(*parse_issue_url(url), f"{parts.scheme}://{parts.netloc}")
+
+
+def fetch_json(session, url, params=None, rate_limiter=None, timeout=30):
+    """
+    Fetches the JSON representation of a loc.gov page.
+
+    Args:
+        session (requests.Session): The HTTP session used to make the request.
+        url (str): The URL of the page.
+        params (dict, optional): Additional query parameters. Defaults to None.
+        rate_limiter (RateLimiter, optional): The rate limiter applied before the request. Defaults to None.
+        timeout (int, optional): The request timeout in seconds. Defaults to 30.
+
+    Returns:
+        dict: The decoded JSON response.
+
+    Raises:
+        SiteError: If the site is overloaded or throttling, or does not respond with JSON.
+        requests.HTTPError: If the server responds with another error status.
+    """
+    query = {"fo": "json"}
+    if params:
+        query.update(params)
+    if rate_limiter:
+        rate_limiter.wait(url)
+    response = session.get(url, params=query, timeout=timeout)
+    if response.status_code in THROTTLE_STATUS_CODES:
+        raise SiteError(f"{url} responded with status {response.status_code}", parse_retry_after(response))
+    response.raise_for_status()
+    try:
+        return response.json()
+    except ValueError:
+        raise SiteError(f"{url} did not respond with JSON")
+
+
+def list_issues(session, lccn, start_date=None, end_date=None, base_url=LOC_BASE_URL, rate_limiter=None):
+    """
+    Lists the issues of a newspaper title, ordered by date.
+
+    Args:
+        session (requests.Session): The HTTP session used to make the requests.
+        lccn (str): The LCCN of the newspaper title.
+        start_date (str, optional): The first issue date to include, formatted as YYYY-MM-DD. Defaults to None.
+        end_date (str, optional): The last issue date to include, formatted as YYYY-MM-DD. Defaults to None.
+        base_url (str, optional): The base URL of the site. Defaults to LOC_BASE_URL.
+        rate_limiter (RateLimiter, optional): The rate limiter applied before each request. Defaults to None.
+
+    Returns:
+        list: The item URLs of the issues.
+    Comments:
+        The issues are resolved from the Chronicling America collection search, which is paginated.
+        Each result links to an item page, from which the LCCN, date and edition of the issue are parsed.
+    """
+    search_url = f"{base_url}/collections/chronicling-america/"
+    params = {"fa": f"number_lccn:{lccn}", "c": ISSUES_PER_PAGE, "sb": "date", "sp": 1}
+
+    issues = {}
+    while True:
+        with stage("issue_list", lccn=lccn, page=params["sp"]):
+            data = fetch_json(session, search_url, params, rate_limiter)
+
+        for result in data.get("results", []):
+            try:
+                result_lccn, date, edition = parse_issue_url(result.get("id", ""))
+            except ValueError:
+                continue
+            if start_date and date < start_date:
+                continue
+            if end_date and date > end_date:
+                continue
+            issues[(date, edition)] = build_issue_url(result_lccn, date, edition, base_url)
+
+        pagination = data.get("pagination") or {}
+        if not pagination.get("next"):
+            break
+        params["sp"] += 1
+
+    return [issues[key] for key in sorted(issues)]
+
+
+def select_file_url(page_files, mimetype, file_extension):
+    """
+    Selects the URL of a file of the given type from the files of a page.
+
+    Args:
+        page_files (list): The file entries of a page, as listed in the item JSON.
+        mimetype (str): The mimetype of the file to select.
+        file_extension (str): The file extension used when the mimetype is missing.
+
+    Returns:
+        str: The URL of the file, or None if the page has no such file.
+    """
+    for page_file in page_files:
+        if page_file.get("mimetype") == mimetype:
+            return page_file.get("url")
+    for page_file in page_files:
+        if page_file.get("url", "").endswith(f".{file_extension}"):
+            return page_file.get("url")
+    return None
+
+
+def get_issue_pages(item_json):
+    """
+    Extracts the PDF and OCR(ALTO) URLs of each page of an issue.
+
+    Args:
+        item_json (dict): The JSON representation of the issue item page.
+
+    Returns:
+        list: One dict per page, with the page number and its 'pdf' and 'alto' URLs.
+    Comments:
+        The item JSON lists the files of the issue under resources[0].files, with one list of file entries per page.
+    """
+    resources = item_json.get("resources") or [{}]
+    pages = []
+    for index, page_files in enumerate(resources[0].get("files", []), start=1):
+        pages.append({
+            "page": str(index),
+            "pdf": select_file_url(page_files, "application/pdf", "pdf"),
+            "alto": select_file_url(page_files, "text/xml", "xml"),
+        })
+    return pages
+
+
+def get_publication_folder(item):
+    """
+    Builds the folder name of an issue from its title and date.
+
+    Args:
+        item (dict): The 'item' section of the issue JSON.
+
+    Returns:
+        str: The folder name, relative to the downloads folder.
+    Comments:
+        Every engine names folders with this function (see fetch_publication_folder), so that switching engines
+        continues in the same folders.
+    """
+    title = item.get("newspaper_title") or item.get("title") or "Unknown_title"
+    if isinstance(title, list):
+        title = title[0]
+    date = item.get("date") or "Unknown_date"
+    return sanitize_filename(title.strip()) + "/" + sanitize_filename(date.strip())
+
+
+def fetch_publication_folder(session, issue_url, rate_limiter=None):
+    """
+    Fetches the item JSON of an issue and builds its folder name, for engines that do not otherwise read the JSON API.
+
+    Args:
+        session (requests.Session): The HTTP session used to make the request.
+        issue_url (str): Any resource or item URL of the issue.
+        rate_limiter (RateLimiter, optional): The rate limiter applied before the request. Defaults to None.
+
+    Returns:
+        str: The folder name, relative to the downloads folder, as built by get_publication_folder.
+
+    Raises:
+        SiteError or requests.RequestException: If the item JSON cannot be fetched.
+    """
+    item_json = fetch_json(session, get_issue_key(issue_url), rate_limiter=rate_limiter)
+    return get_publication_folder(item_json.get("item", {}))
+
+
+def metadata_from_item(item):
+    """
+    Converts the 'item' section of the issue JSON into the metadata written to metadata.json.
+
+    Args:
+        item (dict): The 'item' section of the issue JSON.
+
+    Returns:
+        dict: The metadata, keyed by human readable field names.
+    Comments:
+        Field names are converted from snake case to title case (e.g. 'contributor_names' becomes 'Contributor Names').
+        As with the browser-based download, single-valued lists are stored as plain strings.
+    """
+    metadata = {}
+    for key, value in item.items():
+        if isinstance(value, dict) or value in (None, "", []):
+            continue
+        title = key.replace("_", " ").title()
+        if isinstance(value, list) and len(value) == 1:
+            value = value[0]
+        metadata[title] = value
+    return metadata
+
+
+def download_issue(fetcher, issue_url, downloads_root, manifest=None):
+    """
+    Downloads all pages of an issue along with its metadata.
+
+    Args:
+        fetcher (ConcurrentFetcher): The fetcher used to make the requests.
+        issue_url (str): The item URL of the issue.
+        downloads_root (str): The root folder of the downloads.
+        manifest (Manifest, optional): The manifest recording the progress of the run. Defaults to None.
+
+    Returns:
+        bool: True if every file of the issue was downloaded, False if files are missing from the issue or do not exist (e.g. 404).
+
+    Raises:
+        SiteError: If files failed with errors worth retrying (throttling, server or network errors), after recording them.
+    Comments:
+        The PDF and OCR(ALTO) files of all pages are downloaded in parallel.
+        Files the manifest records as complete (and whose size on disk still matches) are not downloaded again.
+    """
+    with stage("navigation", url=issue_url):
+        item_json = fetch_json(fetcher.session, issue_url, rate_limiter=fetcher.rate_limiter)
+    item = item_json.get("item", {})
+
+    with stage("metadata", url=issue_url):
+        download_folder = os.path.join(downloads_root, get_publication_folder(item))
+        os.makedirs(download_folder, exist_ok=True)
+        if manifest:
+            manifest.start_issue(issue_url, download_folder)
+
+        with open(os.path.join(download_folder, "metadata.json"), "w", encoding="utf-8") as f:
+            json.dump(metadata_from_item(item), f, ensure_ascii=False, indent=4)
+
+    jobs = []
+    job_pages = []
+    missing_files = 0
+    for page in get_issue_pages(item_json):
+        for key, file_type, file_extension in (("pdf", "PDF", "pdf"), ("alto", "OCR(ALTO)", "xml")):
+            if not page[key]:
+                print(f"No {file_type} available for page {page['page']}")
+                missing_files += 1
+                continue
+            file_path = os.path.join(download_folder, f"page_{page['page']}.{file_extension}")
+            if manifest and manifest.is_file_complete(file_path):
+                continue
+            jobs.append((page[key], file_path))
+            job_pages.append((page["page"], file_type))
+
+    results = fetcher.fetch_all(jobs)
+    print(f"Downloaded {sum(1 for checksum in results if checksum)} of {len(jobs)} files to {download_folder}")
+
+    statuses = [None if checksum else fetcher.errors.pop(file_path, None) for (_, file_path), checksum in zip(jobs, results)]
+    if manifest:
+        for (file_url, file_path), (page_number, file_type), checksum, status in zip(jobs, job_pages, results, statuses):
+            error = None if checksum else f"Download failed (status {status})" if status else "Download failed"
+            manifest.record_file(file_path, issue_url, page_number, file_type, file_url, error=error, sha256=checksum)
+
+    complete = all(results) and not missing_files
+    if manifest:
+        manifest.finish_issue(issue_url, complete)
+
+    retryable = sum(1 for checksum, status in zip(results, statuses) if not checksum and is_transient_failure(status))
+    if retryable:
+        raise SiteError(f"{retryable} files of {issue_url} failed with errors worth retrying")
+    return complete
+
+
+def download_newspaper_pages_api(url, downloads_root=None, end_date=None, base_url=LOC_BASE_URL,
+                                 max_workers=DEFAULT_MAX_WORKERS, requests_per_second=DEFAULT_REQUESTS_PER_SECOND, range_parts=0,
+                                 on_file=None, cache=None):
+    """
+    Downloads newspaper pages over HTTP, starting from the issue of a given URL.
+
+    Args:
+        url (str): The URL of the first issue to download (any resource or item URL of the issue).
+        downloads_root (str, optional): The root folder of the downloads. Defaults to ./downloads.
+        end_date (str, optional): The last issue date to download, formatted as YYYY-MM-DD. Defaults to None.
+        base_url (str, optional): The base URL of the site. Defaults to LOC_BASE_URL.
+        max_workers (int, optional): The maximum number of concurrent downloads. Defaults to DEFAULT_MAX_WORKERS.
+        requests_per_second (float, optional): The maximum number of requests per second sent to the site. Defaults to DEFAULT_REQUESTS_PER_SECOND.
+        range_parts (int, optional): The number of parallel byte-range requests used for large PDFs; 0 disables them. Defaults to 0.
+        on_file (callable, optional): Called with the path of every file downloaded, e.g. to transcribe pages as they arrive. Defaults to None.
+        cache (ResponseCache, optional): A cache for the HTTP responses (issue lists, item JSON, ALTO files), see http_cache.py. Defaults to None.
+
+    Returns:
+        None
+    Comments:
+        This is the browserless counterpart of download_pages.download_newspaper_pages.
+        It writes the same downloads/<title>/<date>/page_N.{pdf,xml} and metadata.json layout.
+        Progress is recorded in downloads/manifest.sqlite, so an interrupted run can simply be started again:
+        complete issues are skipped and only failed or partial files are downloaded.
+    """
+    if downloads_root is None:
+        downloads_root = os.path.join(os.getcwd(), "downloads")
+    os.makedirs(downloads_root, exist_ok=True)
+
+    lccn, start_date, _ = parse_issue_url(url)
+    timer.restart()
+
+    with ConcurrentFetcher(max_workers, requests_per_second, range_parts=range_parts, on_file=on_file,
+                           cache=cache) as fetcher, \
+            Manifest(os.path.join(downloads_root, MANIFEST_FILENAME)) as manifest:
+        issue_urls = list_issues(fetcher.session, lccn, start_date, end_date, base_url, fetcher.rate_limiter)
+        print(f"Found {len(issue_urls)} issues of {lccn}")
+
+        for issue_url in issue_urls:
+            if manifest.is_issue_complete(issue_url):
+                print(f"Skipping {issue_url}, already downloaded")
+                continue
+
+            print(f"Downloading pages of {issue_url}")
+            try:
+                download_issue(fetcher, issue_url, downloads_root, manifest)
+            except (requests.RequestException, SiteError, ValueError) as e:
+                print(f"An error occurred while downloading {issue_url}: {str(e)}")
+                manifest.start_issue(issue_url)
+                manifest.finish_issue(issue_url, complete=False)
+
+    timer.print_summary()
+
+
+if __name__ == "__main__":
+    download_newspaper_pages_api(newspaper_url)
@@ -0,0 +1,634 @@
+import requests
+import time
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+from lxml import html, etree
+import os
+import json
+import glob
+from urllib.parse import urlsplit
+
+from .fetcher import ConcurrentFetcher, download_file, validate_download, jittered_delay
+from .download_api import get_issue_key, parse_issue_url, build_resource_url, fetch_publication_folder, SiteError, newspaper_url
+from .manifest import Manifest, MANIFEST_FILENAME
+from .download_watcher import DownloadWatcher, WATCHDOG_AVAILABLE
+from .timing import stage, timer
+
+def setup_chrome_options(current_chrome_options, download_folder):
+    """
+    Set up Chrome options for downloading files.
+    Args:
+        current_chrome_options (ChromeOptions): The current Chrome options object.
+        download_folder (str): The path to the download folder.
+    Returns:
+        ChromeOptions: The updated Chrome options object.
+    """
+    # Set up Chrome options for downloading files
+    current_chrome_options.add_experimental_option("prefs", {
+        "download.default_directory": download_folder,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "plugins.always_open_pdf_externally": True,
+        "safebrowsing.enabled": True
+    })
+    
+    # Force XML files to be downloaded instead of opened in the browser
+    current_chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    current_chrome_options.add_argument('--safebrowsing-disable-download-protection')
+    current_chrome_options.add_argument('--safebrowsing-disable-extension-blacklist')
+    
+    return current_chrome_options
+
+def get_page_snapshot(driver, timeout=10):
+    """
+    Takes a snapshot of the page open in the browser and parses it locally.
+
+    Args:
+        driver (WebDriver): The WebDriver instance.
+        timeout (int, optional): The maximum time to wait for the page to finish loading, in seconds. Defaults to 10.
+
+    Returns:
+        HtmlElement: The root of the parsed page.
+    Raises:
+        WebDriverException: If the page source cannot be read from the browser.
+        lxml.etree.LxmlError: If the page source cannot be parsed, e.g. because it is empty.
+    Comments:
+        The page source is fetched in a single WebDriver call. Reading the publication info and the metadata
+        from the snapshot needs no further calls, and a missing element is known immediately instead of after a timeout.
+        If the page is still loading after the timeout, whatever has loaded so far is used.
+    """
+    try:
+        WebDriverWait(driver, timeout).until(lambda d: d.execute_script("return document.readyState") == "complete")
+    except TimeoutException:
+        print("Page did not finish loading, reading it as is")
+    return html.fromstring(driver.page_source)
+
+def element_text(element):
+    """
+    Gets the text of an element, with whitespace collapsed as the browser would display it.
+
+    Args:
+        element (HtmlElement): The element.
+
+    Returns:
+        str: The text of the element.
+    """
+    return " ".join(element.text_content().split())
+
+def get_publication_info(page, xpath, item_description):
+    """
+    Retrieves the publication information from a web page.
+
+    Args:
+        page (HtmlElement): The parsed page, as returned by get_page_snapshot.
+        xpath (str): The XPath expression to locate the information element.
+        item_description (str): A description of the publication item.
+
+    Returns:
+        str: The publication information text, stripped of leading and trailing whitespace.
+        If the element is not on the page, "Unknown_" followed by the item description.
+    """
+    info_elements = page.xpath(xpath)
+    if not info_elements:
+        print(f"Error getting publication {item_description}")
+        return f"Unknown_{item_description}"
+    return element_text(info_elements[0])
+
+def extract_and_save_metadata(page, download_folder):
+    """
+    Extracts metadata from a web page and saves it as a JSON file.
+    Args:
+        page: The parsed page, as returned by get_page_snapshot.
+        download_folder: The folder where the metadata JSON file will be saved.
+    Returns:
+        None
+    Comments:
+        The metadata is extracted from the "item-cataloged-data" div on the page. 
+        The div is structured by h3 elements with a following ul element containing the metadata.
+        The script extracts the title of the h3 element and the text of the li elements in the ul and uses this to contruct the json metadata output file.
+    """
+    # Find the metadata div
+    metadata_divs = page.xpath('//*[@id="item-cataloged-data"]')
+    if not metadata_divs:
+        print("Error extracting metadata")
+        return
+
+    metadata = {}
+
+    #for each h3 element, find the following ul element and extract the li elements
+    for h3 in metadata_divs[0].iter("h3"):
+        title = element_text(h3)
+        ul = h3.xpath("following-sibling::ul[1]")
+        if not ul:
+            continue
+        li_elements = ul[0].xpath(".//li")
+
+        if len(li_elements) == 1:
+            metadata[title] = element_text(li_elements[0])
+        else:
+            metadata[title] = [element_text(li) for li in li_elements]
+
+    # Save metadata as JSON
+    with open(os.path.join(download_folder, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=4)
+
+    print("Metadata saved successfully.")
+
+
+def handle_technical_difficulties(driver, max_retries=3, delay=5):
+    """
+    Handle the "We're experiencing technical difficulties" error by refreshing the page.
+    
+    :param driver: The Selenium WebDriver instance
+    :param max_retries: Maximum number of refresh attempts
+    :param delay: Base delay between refresh attempts in seconds. It doubles after each attempt, with random jitter.
+    :return: True if the error is resolved, False otherwise
+    """
+    for attempt in range(max_retries):
+        if "site-error" in driver.page_source:
+            print(f"Encountered technical difficulties. Attempt {attempt + 1} of {max_retries} to refresh...")
+            driver.refresh()
+            time.sleep(jittered_delay(attempt, delay))
+        else:
+            return True
+    return False
+
+
+def wait_for_download_complete(directory, file_ext, timeout=60, check_interval=1):
+    """
+    Wait for the download to complete by monitoring file size.
+    Args:
+        directory (str): The directory where the downloaded files are located.
+        file_ext (str): The file extension of the downloaded files.
+        timeout (int, optional): The maximum time to wait for the download to complete, in seconds. Defaults to 60.
+        check_interval (int, optional): The interval at which to check the file size, in seconds. Defaults to 1.
+    Returns:
+        str: The path of the latest downloaded file if the download is complete within the timeout.
+        None: If the download does not complete within the timeout.
+    """
+    deadline = time.time() + timeout
+    latest_file = None
+    last_size = -1
+
+    while time.time() < deadline:
+        # Find the latest file of type file_ext in the directory that doesn't start with "page_"
+        files = [f for f in glob.glob(os.path.join(directory, f'*.{file_ext}')) if not os.path.basename(f).startswith('page_')]
+        if not files:
+            time.sleep(check_interval)
+            continue
+        
+        latest_file = max(files, key=os.path.getmtime)
+        
+        # Check if the file size has stopped changing
+        current_size = os.path.getsize(latest_file)
+        if current_size == last_size:
+            return latest_file  # Download is complete
+        
+        last_size = current_size
+        time.sleep(check_interval)
+    
+    return None  # Timeout reached
+
+
+def rename_latest_file(latest_file, new_file_name, max_attempts=5, delay=1):
+    """Rename the downloaded file with multiple attempts.
+    Args:
+        latest_file (str): The path of the latest downloaded file.
+        new_file_name (str): The new name for the file.
+        max_attempts (int, optional): The maximum number of attempts to rename the file. Defaults to 5.
+        delay (int, optional): The delay in seconds between each attempt. Defaults to 1.
+    Returns:
+        bool: True if the file was successfully renamed, False otherwise.
+    """
+    if not latest_file:
+        print("No file to rename.")
+        return False
+
+    for attempt in range(max_attempts):
+        try:
+            new_file_path = os.path.join(os.path.dirname(latest_file), new_file_name)
+            
+            # If a file with the new name already exists, delete it
+            if os.path.exists(new_file_path):
+                os.remove(new_file_path)
+            
+            os.rename(latest_file, new_file_path)
+            print(f"Successfully renamed file to {new_file_name}")
+            return True
+        except Exception as e:
+            print(f"Error renaming file (attempt {attempt + 1}): {str(e)}")
+            time.sleep(delay)
+    
+    print(f"Failed to rename file after {max_attempts} attempts")
+    return False
+
+
+
+def download_and_rename_file(driver, download_folder, file_type, current_page, fetcher=None, watcher=None):
+    """Downloads a file of the specified type and renames it based on the current page number.
+
+    Args:
+        driver: The WebDriver instance used for interacting with the web page.
+        download_folder: The path to the folder where the downloaded files will be saved.
+        file_type: The type of file to be downloaded. Can be either 'PDF' or 'OCR(ALTO)'.
+        current_page: The current page number.
+        fetcher: Optional ConcurrentFetcher. When given, the OCR(ALTO) file is downloaded in the background over its pooled session.
+        watcher: Optional DownloadWatcher on the download folder. When given, the finished PDF is detected from file system events instead of polling.
+
+    Returns:
+        bool: True if the file was downloaded and renamed successfully, False otherwise.
+        Future: For a queued OCR(ALTO) download, a future resolving to True or False once the download finishes.
+
+    Raises:
+        None
+
+    Comments:
+        The function first waits for the download dropdown to be present on the page.
+        If the file type is 'OCR(ALTO)', it locates the option element for 'OCR(ALTO)' and retrieves the download URL.
+        It then streams the OCR(ALTO) file to the download folder with fetcher.download_file, which validates it before renaming it into place.
+        If a fetcher is given, the download is queued instead, and the caller waits for it with fetcher.wait().
+        If the file type is 'PDF', it locates the option element for 'PDF', clicks the download button, and waits for the download to complete.
+        The finished PDF is checked with fetcher.validate_download and discarded if it is truncated or corrupt.
+        With a watcher, the download is registered before clicking so that exactly the file it produces is reported.
+        The function then renames the downloaded file to 'page_{current_page}.pdf' or 'page_{current_page}.xml' based on the file type.
+
+    """
+
+    # Wait for the download dropdown to be present
+    download_dropdown = WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.ID, "download"))
+    )
+
+    if file_type == "OCR(ALTO)":
+        # Find the OCR(ALTO) option and get its value
+        ocr_option = download_dropdown.find_element(By.XPATH, f"//option[contains(text(), '{file_type}')]")
+        download_url = ocr_option.get_attribute("value")
+
+        # Download the OCR(ALTO) file using requests (because using the same method as the pdf doesn't work because Chrome wants to open the xml file in a new tab)
+        file_path = os.path.join(download_folder, f"page_{current_page}.xml")
+        if fetcher:
+            print(f"Queued OCR(ALTO) download for page {current_page}")
+            return fetcher.submit(download_url, file_path)
+
+        with requests.Session() as session:
+            downloaded = download_file(session, download_url, file_path)
+        if downloaded:
+            print(f"Successfully downloaded OCR(ALTO) for page {current_page}")
+            return True
+        else:
+            print(f"Failed to download OCR(ALTO) for page {current_page}")
+            return False
+
+    else:
+        # For PDF, use the dropdown to select the PDF option and click the download button
+        with stage("pdf_fetch", page=current_page):
+            download_dropdown.find_element(By.XPATH, f"//option[contains(text(), '{file_type}')]").click()
+            download_button = WebDriverWait(driver, 10).until(
+                EC.element_to_be_clickable((By.XPATH, './/div[@class="files input-group-small"]//button[@type="submit"]'))
+            )
+            if watcher:
+                download_ticket = watcher.expect("pdf")
+            download_button.click()
+
+        # Wait for the download to complete and get the file path
+        if file_type == "OCR(ALTO)":
+            file_extension = "xml" 
+        elif file_type == "PDF":
+            file_extension = "pdf"
+
+
+        #get latest downloaded file
+        with stage("completion_wait", page=current_page):
+            if watcher:
+                latest_file = watcher.wait(download_ticket)
+            else:
+                latest_file = wait_for_download_complete(download_folder, file_extension)
+        print(f"Latest file: {latest_file}")
+        error = validate_download(latest_file) if latest_file else None
+        if error:
+            print(f"Discarding {file_type} download for page {current_page}: {error}")
+            os.remove(latest_file)
+        elif latest_file:
+            print(f"{file_type} download completed successfully")
+            new_file_name = f"page_{current_page}.{file_extension}"
+
+            # Rename the downloaded file
+            with stage("rename", page=current_page):
+                renamed = rename_latest_file(latest_file, new_file_name)
+            if renamed:
+                timer.record_download(os.path.getsize(os.path.join(download_folder, new_file_name)), page=True)
+                print(f"Successfully processed {file_type} for page {current_page}")
+                return True
+            else:
+                print(f"Warning: Could not rename {file_type} file for page {current_page}")
+        else:
+            print(f"{file_type} download timed out or failed")
+        return False
+
+
+def download_page_file(driver, manifest, issue_url, download_folder, file_type, current_page, fetcher=None, watcher=None):
+    """
+    Downloads a file of a page unless the manifest records it as complete, and records the outcome in the manifest.
+
+    Args:
+        driver: The WebDriver instance used for interacting with the web page.
+        manifest (Manifest): The manifest recording the progress of the run.
+        issue_url (str): The URL of the current issue.
+        download_folder (str): The path to the folder where the downloaded files will be saved.
+        file_type (str): The type of file to be downloaded. Can be either 'PDF' or 'OCR(ALTO)'.
+        current_page (str): The current page number.
+        fetcher (ConcurrentFetcher, optional): The fetcher used for background OCR(ALTO) downloads. Defaults to None.
+            Its on_file callback, if any, is also called for the PDFs downloaded by the browser, so pass it for both file types.
+        watcher (DownloadWatcher, optional): The watcher used to detect finished PDF downloads. Defaults to None.
+
+    Returns:
+        bool: False if the download failed, True otherwise (including when it was skipped or queued).
+    """
+    file_extension = "pdf" if file_type == "PDF" else "xml"
+    file_path = os.path.join(download_folder, f"page_{current_page}.{file_extension}")
+    if manifest.is_file_complete(file_path):
+        print(f"{file_type} for page {current_page} already downloaded, skipping")
+        return True
+
+    result = download_and_rename_file(driver, download_folder, file_type, current_page, fetcher, watcher)
+
+    if isinstance(result, bool):
+        manifest.record_file(file_path, issue_url, current_page, file_type, error=None if result else "Download failed")
+        if result and fetcher and fetcher.on_file:
+            fetcher.on_file(file_path)
+        return result
+
+    # Queued download: record it once it finishes
+    result.add_done_callback(lambda future: manifest.record_file(
+        file_path, issue_url, current_page, file_type, error=None if future.result() else "Download failed",
+        sha256=future.result()))
+    return True
+
+
+def set_download_directory(driver, download_folder):
+    """
+    Changes the folder where Chrome saves downloads, without restarting the browser.
+
+    Args:
+        driver (WebDriver): The Chrome WebDriver instance.
+        download_folder (str): The path to the download folder.
+    """
+    driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+        "behavior": "allow",
+        "downloadPath": download_folder,
+    })
+
+
+def download_issue_pages(driver, manifest, issue_url, download_folder, fetcher, watcher=None):
+    """
+    Downloads the PDF and OCR(ALTO) files of every page of the issue open in the browser.
+
+    Args:
+        driver (WebDriver): The WebDriver instance, showing the first page of the issue.
+        manifest (Manifest): The manifest recording the progress of the run.
+        issue_url (str): The URL of the issue.
+        download_folder (str): The path to the folder where the downloaded files will be saved.
+        fetcher (ConcurrentFetcher): The fetcher used for background OCR(ALTO) downloads.
+        watcher (DownloadWatcher, optional): The watcher used to detect finished PDF downloads. Defaults to None.
+
+    Returns:
+        bool: True if every page was processed without errors, False otherwise.
+    """
+    issue_complete = True
+
+    while True:  # Loop for pages within an issue
+        try:
+            # Check for technical difficulties and handle if necessary
+            if not handle_technical_difficulties(driver):
+                print("Unable to resolve technical difficulties. Skipping to next issue.")
+                return False
+
+            # Wait for the download button to be present
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "download")))
+
+            # Get the current page number
+            page_dropdown = WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.ID, "page"))
+            )
+
+            current_page = page_dropdown.find_element(By.CSS_SELECTOR, "option[selected]").get_attribute("value")
+            print(f"Processing page {current_page}")
+
+            # Download PDF
+            if not download_page_file(driver, manifest, issue_url, download_folder, "PDF", current_page, fetcher, watcher):
+                issue_complete = False
+
+            # Download OCR ALTO
+            if not download_page_file(driver, manifest, issue_url, download_folder, "OCR(ALTO)", current_page, fetcher):
+                issue_complete = False
+
+            # Move to the next page
+            next_button = WebDriverWait(driver, 10).until(
+                EC.element_to_be_clickable((By.XPATH, '//a[contains(@class, "next")]'))
+            )
+
+            if "off" in next_button.get_attribute("class"):
+                print("Reached the last page of the current issue.")
+                return issue_complete
+
+            with stage("next_page", page=current_page):
+                next_button.click()
+                time.sleep(2)
+
+        except StaleElementReferenceException:
+            print("Page reloaded, retrying...")
+            continue
+
+        except Exception as e:
+            print(f"An error occurred while downloading pages: {str(e)}")
+            return False
+
+
+def download_issue_in_browser(driver, url, manifest, fetcher, downloads_root):
+    """
+    Downloads one issue: its metadata and the PDF and OCR(ALTO) files of all its pages.
+
+    Args:
+        driver (WebDriver): The Chrome WebDriver instance.
+        url (str): The URL of the first page of the issue.
+        manifest (Manifest): The manifest recording the progress of the run.
+        fetcher (ConcurrentFetcher): The fetcher used for background OCR(ALTO) downloads.
+        downloads_root (str): The root folder of the downloads.
+
+    Returns:
+        bool: True if the issue was downloaded completely (now or by an earlier run), False otherwise.
+    Comments:
+        The download folder of the browser is switched to the folder of the issue at runtime,
+        so the same browser can be reused for any number of issues.
+        The browser is left on the last page of the issue, or on its first page if the manifest records it as complete.
+    """
+    with stage("navigation", url=url):
+        driver.get(url)
+
+    # Issues are recorded in the manifest by their item URL, as with the other engines
+    issue_url = get_issue_key(url)
+    if manifest.is_issue_complete(issue_url):
+        print(f"Skipping {issue_url}, already downloaded")
+        return True
+    manifest.start_issue(issue_url)
+
+    # Check for technical difficulties and handle if necessary
+    if not handle_technical_difficulties(driver):
+        print("Unable to resolve technical difficulties. Skipping issue.")
+        manifest.finish_issue(issue_url, complete=False)
+        return False
+
+    with stage("metadata", url=url):
+        # Read the title, date and metadata from a single snapshot of the page
+        try:
+            page = get_page_snapshot(driver)
+        except (WebDriverException, etree.LxmlError) as e:
+            print(f"Error reading the page of {issue_url}: {str(e)}. Skipping issue.")
+            manifest.finish_issue(issue_url, complete=False)
+            return False
+
+        # Get the publication title and date, to report progress
+        publication_title = get_publication_info(page, './/div[@id="part-of"]//ul[@aria-labelledby="item-facet-part-of"]/li[1]/a', "title")
+        publication_date = get_publication_info(page, './/div[@id="facets-box"]//ul[@aria-labelledby="item-facet-dates"]/li/a', "date")
+
+        print(f"Downloading pages of {publication_title} - {publication_date}")
+
+        # Name the folder from the item JSON, as download_api.py does, so that both engines write to the same folder.
+        # If the JSON API is unavailable, leave the issue to a later run rather than saving it under another name.
+        try:
+            folder_name = fetch_publication_folder(fetcher.session, issue_url, fetcher.rate_limiter)
+        except (SiteError, requests.RequestException) as e:
+            print(f"Could not read the folder name of {issue_url} from the JSON API: {str(e)}. Skipping issue.")
+            manifest.finish_issue(issue_url, complete=False)
+            return False
+
+        download_folder = os.path.join(downloads_root, folder_name)
+        os.makedirs(download_folder, exist_ok=True)
+
+        # Extract and save metadata
+        extract_and_save_metadata(page, download_folder)
+
+    # Point the browser's downloads at the folder of the issue
+    set_download_directory(driver, download_folder)
+
+    # Detect finished downloads from file system events when watchdog is installed, otherwise poll
+    watcher = None
+    if WATCHDOG_AVAILABLE:
+        watcher = DownloadWatcher(download_folder)
+        watcher.start()
+
+    try:
+        issue_complete = download_issue_pages(driver, manifest, issue_url, download_folder, fetcher, watcher)
+    finally:
+        if watcher:
+            watcher.stop()
+
+    # Wait for the OCR(ALTO) downloads of the current issue
+    failed_downloads = fetcher.wait()
+    if failed_downloads:
+        print(f"Warning: {failed_downloads} OCR(ALTO) downloads failed for {publication_title} - {publication_date}")
+        issue_complete = False
+
+    manifest.finish_issue(issue_url, issue_complete)
+    return issue_complete
+
+
+def move_to_next_issue(driver):
+    """
+    Clicks the "Next issue" button.
+
+    Args:
+        driver (WebDriver): The WebDriver instance.
+
+    Returns:
+        str: The URL of the next issue, or None if this was the last issue or the button could not be used.
+    """
+    try:
+        with stage("next_issue"):
+            # Look for the "Next issue" button
+            next_issue_button = WebDriverWait(driver, 10).until(
+                EC.element_to_be_clickable((By.XPATH, '//a[contains(@aria-labelledby, "next issue")]'))
+            )
+
+            # Check if the "Next issue" button is disabled, if so then end
+            if "off" in next_issue_button.get_attribute("class"):
+                print("Reached the last issue.")
+                return None
+
+            # Click the "Next issue" button
+            next_issue_button.click()
+            print("Moving to the next issue...")
+            time.sleep(5)  # Wait for the new issue page to load
+            return driver.current_url
+
+    except Exception as e:
+        print(f"An error occurred while moving to the next issue: {str(e)}")
+        return None
+
+
+def download_newspaper_pages(url, on_file=None, cache=None):
+    """
+    Downloads newspaper pages from a given URL.
+    Args:
+        url (str): The URL of the newspaper page.
+        on_file (callable, optional): Called with the path of every file downloaded, e.g. to transcribe pages as they arrive. Defaults to None.
+        cache (ResponseCache, optional): A cache for the OCR(ALTO) downloads, see http_cache.py. Pages opened in the browser are not cached. Defaults to None.
+    Returns:
+        None
+    Comments:
+        Progress is recorded in downloads/manifest.sqlite. When the script is started again for the same newspaper,
+        it continues from the most recent incomplete issue, and issues and files that were already downloaded are skipped.
+        To download several issues at once in headless browsers, use browser_pool.download_newspaper_pages_parallel.
+    """
+
+    downloads_root = os.path.join(os.getcwd(), "downloads")
+    os.makedirs(downloads_root, exist_ok=True)
+    manifest = Manifest(os.path.join(downloads_root, MANIFEST_FILENAME))
+    timer.restart()
+
+    # Continue from the most recent incomplete issue of the same newspaper, if any
+    lccn, _, _ = parse_issue_url(url)
+    site_url = "{0.scheme}://{0.netloc}".format(urlsplit(url))
+    resume_url = manifest.last_incomplete_issue(f"{site_url}/item/{lccn}/")
+    if resume_url:
+        print(f"Resuming from {resume_url}")
+        url = build_resource_url(*parse_issue_url(resume_url), site_url)
+
+    # Open a Chrome browser set up for downloading files. The download folder is switched per issue.
+    chrome_options = Options()
+    chrome_options.add_argument("--window-size=500,500")
+    chrome_options = setup_chrome_options(chrome_options, downloads_root)
+    driver = webdriver.Chrome(options=chrome_options)
+
+    # OCR(ALTO) files are fetched in the background while the browser moves on to the next page
+    fetcher = ConcurrentFetcher(on_file=on_file, cache=cache)
+
+    try:
+        while url:  # Main loop to cycle through all issues
+            try:
+                download_issue_in_browser(driver, url, manifest, fetcher, downloads_root)
+            except (WebDriverException, etree.LxmlError) as e:
+                # Record the issue as failed, so that a later run resumes it, and carry on with the next one
+                print(f"An error occurred while downloading {url}: {str(e)}")
+                issue_url = get_issue_key(url)
+                if not manifest.is_issue_complete(issue_url):
+                    manifest.start_issue(issue_url)
+                    manifest.finish_issue(issue_url, complete=False)
+
+            # After finishing all pages of the current issue, try to move to the next issue
+            url = move_to_next_issue(driver)
+    finally:
+        fetcher.close()
+        manifest.close()
+        driver.quit()
+
+    timer.print_summary()
+
+
+if __name__ == "__main__":
+    # Call the function to download the newspaper pages
+    download_newspaper_pages(newspaper_url)
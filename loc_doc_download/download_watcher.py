@@ -0,0 +1,132 @@
+import os
+import threading
+
+# watchdog delivers inotify (Linux), FSEvents (macOS) and ReadDirectoryChangesW (Windows) events.
+# Without it, download_pages falls back to polling the download folder.
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+WATCHDOG_AVAILABLE = Observer is not None
+
+# Suffixes of the partial files browsers write while a download is in progress
+PARTIAL_SUFFIXES = (".crdownload", ".part", ".partial", ".download", ".tmp")
+
+
+class DownloadWatcher:
+    """
+    Detects finished downloads in a folder from file system events, instead of polling it.
+
+    Args:
+        directory (str): The folder where the browser saves downloads.
+    Comments:
+        Chrome writes a download to a '.crdownload' partial file and renames it once it is complete,
+        so a download is reported as finished when a file with the final extension is moved into place
+        (or, for browsers that write in place, closed after writing).
+        Call expect() before starting a download and wait() with the returned ticket afterwards:
+        each ticket is matched to exactly one file that finished after the ticket was issued,
+        so concurrent downloads of the same type are never confused with each other.
+        Files named 'page_*' are the renamed results of earlier downloads and are ignored.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.condition = threading.Condition()
+        self.completed = []  # (sequence, path) of finished downloads, in the order they finished
+        self.claimed = set()  # sequences of the finished downloads already handed out
+        self.sequence = 0
+        self.observer = None
+
+    def start(self):
+        """
+        Starts watching the folder.
+
+        Raises:
+            RuntimeError: If the watchdog package is not installed.
+        """
+        if not WATCHDOG_AVAILABLE:
+            raise RuntimeError("The watchdog package is required to watch download folders")
+        self.observer = Observer()
+        self.observer.schedule(self, self.directory, recursive=False)
+        self.observer.start()
+
+    def stop(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+    def dispatch(self, event):
+        """
+        Receives file system events from the watchdog observer.
+
+        Args:
+            event (FileSystemEvent): The event.
+        """
+        if event.is_directory:
+            return
+        if event.event_type == "moved":
+            path = event.dest_path
+        elif event.event_type == "closed":
+            path = event.src_path
+        else:
+            return
+
+        name = os.path.basename(path)
+        if name.startswith("page_") or name.endswith(PARTIAL_SUFFIXES):
+            return
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+
+        with self.condition:
+            self.sequence += 1
+            self.completed.append((self.sequence, path))
+            self.condition.notify_all()
+
+    def expect(self, file_ext):
+        """
+        Registers a download that is about to start.
+
+        Args:
+            file_ext (str): The file extension of the expected download.
+
+        Returns:
+            tuple: A ticket to pass to wait().
+        """
+        with self.condition:
+            return (self.sequence, "." + file_ext.lower())
+
+    def wait(self, ticket, timeout=60):
+        """
+        Waits for the download registered with expect() to finish.
+
+        Args:
+            ticket (tuple): The ticket returned by expect().
+            timeout (int, optional): The maximum time to wait, in seconds. Defaults to 60.
+
+        Returns:
+            str: The path of the finished file.
+            None: If no matching download finished within the timeout.
+        """
+        after_sequence, suffix = ticket
+
+        def find_match():
+            for sequence, path in self.completed:
+                if sequence > after_sequence and sequence not in self.claimed and path.lower().endswith(suffix):
+                    return sequence, path
+            return None
+
+        with self.condition:
+            match = self.condition.wait_for(find_match, timeout)
+            if not match:
+                return None
+            self.claimed.add(match[0])
+            return match[1]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
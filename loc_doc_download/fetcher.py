@@ -0,0 +1,417 @@
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait
+import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
+import threading
+import hashlib
+import random
+import time
+import os
+
+from .timing import stage, timer
+
+# Default number of concurrent downloads
+DEFAULT_MAX_WORKERS = 8
+
+# Default cap on the number of requests per second sent to a single host
+DEFAULT_REQUESTS_PER_SECOND = 4.0
+
+# HTTP statuses with which the site signals that it is overloaded or throttling us
+THROTTLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Size of the chunks in which downloads are streamed to disk
+CHUNK_SIZE = 1024 * 1024
+
+# Suffix of the temporary file a download is streamed to before it is renamed into place
+PARTIAL_SUFFIX = ".part"
+
+# Files at least this large are fetched with parallel byte-range requests, when enabled
+RANGE_MIN_SIZE = 8 * 1024 * 1024
+
+
+def jittered_delay(attempt, base_delay=1.0, max_delay=60.0):
+    """
+    Computes an exponential backoff delay with random jitter.
+
+    Args:
+        attempt (int): The number of the attempt that failed, starting at 0.
+        base_delay (float, optional): The delay after the first failure, in seconds. Defaults to 1.0.
+        max_delay (float, optional): The maximum delay, in seconds. Defaults to 60.0.
+
+    Returns:
+        float: The delay in seconds, between half and all of base_delay * 2 ** attempt (capped at max_delay).
+    """
+    delay = min(max_delay, base_delay * 2 ** attempt)
+    return random.uniform(delay / 2, delay)
+
+
+def parse_retry_after(response):
+    """
+    Reads the Retry-After header of a response.
+
+    Args:
+        response (requests.Response): The response.
+
+    Returns:
+        float: The number of seconds the server asks us to wait, or None if it did not say.
+    """
+    retry_after = response.headers.get("Retry-After")
+    try:
+        return float(retry_after) if retry_after else None
+    except ValueError:
+        return None
+
+
+class AdaptiveBackoff:
+    """
+    A delay shared by all workers talking to the site, which grows when the site returns errors and shrinks when requests succeed.
+
+    Args:
+        base_delay (float, optional): The delay after the first error, in seconds. Defaults to 1.0.
+        max_delay (float, optional): The maximum delay, in seconds. Defaults to 300.0.
+    Comments:
+        Each error doubles the delay (or raises it to the server's Retry-After), each success halves it,
+        and the delay drops back to zero once it falls below base_delay. Waits are jittered so that workers
+        do not retry in lockstep.
+    """
+
+    def __init__(self, base_delay=1.0, max_delay=300.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self.lock = threading.Lock()
+
+    def on_error(self, retry_after=None):
+        with self.lock:
+            self.delay = min(self.max_delay, max(self.base_delay, self.delay * 2, retry_after or 0))
+            return self.delay
+
+    def on_success(self):
+        with self.lock:
+            self.delay = self.delay / 2 if self.delay / 2 >= self.base_delay else 0.0
+
+    def wait(self):
+        """
+        Sleeps for the current delay, with jitter.
+        """
+        with self.lock:
+            delay = self.delay
+        if delay:
+            time.sleep(random.uniform(delay / 2, delay))
+
+
+class RateLimiter:
+    """
+    Spaces out requests so that no host receives more than a given number of requests per second.
+
+    Args:
+        requests_per_second (float): The maximum number of requests per second per host. 0 or None disables the limit.
+    """
+
+    def __init__(self, requests_per_second=DEFAULT_REQUESTS_PER_SECOND):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        """
+        Blocks until a request to the host of the given URL is allowed.
+
+        Args:
+            url (str): The URL about to be requested.
+        """
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def create_session(pool_size=DEFAULT_MAX_WORKERS, cache=None):
+    """
+    Creates an HTTP session whose connection pool is large enough for the given number of workers.
+
+    Args:
+        pool_size (int, optional): The number of connections kept open per host. Defaults to DEFAULT_MAX_WORKERS.
+        cache (ResponseCache, optional): A cache the session reads responses from and stores them in, see http_cache.py. Defaults to None.
+
+    Returns:
+        requests.Session: The HTTP session.
+    """
+    session = requests.Session()
+    if cache:
+        from .http_cache import CachingAdapter
+        adapter = CachingAdapter(cache, pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def validate_download(file_path):
+    """
+    Checks that a downloaded file is a complete PDF or a well-formed XML file.
+
+    Args:
+        file_path (str): The path of the file. Its type is taken from its name without the partial suffix.
+
+    Returns:
+        str: A description of the problem, or None if the file is valid (or of another type).
+    """
+    file_extension = os.path.splitext(file_path.removesuffix(PARTIAL_SUFFIX))[1]
+    if file_extension == ".pdf":
+        with open(file_path, "rb") as file:
+            if file.read(5) != b"%PDF-":
+                return "not a PDF file"
+            file.seek(max(0, os.path.getsize(file_path) - 1024))
+            if b"%%EOF" not in file.read():
+                return "PDF file is truncated (no %%EOF marker)"
+    elif file_extension == ".xml":
+        try:
+            for event, element in ET.iterparse(file_path):
+                element.clear()
+        except ET.ParseError as e:
+            return f"malformed XML ({str(e)})"
+    return None
+
+
+def fetch_ranges(session, url, file_path, size, parts, rate_limiter=None, timeout=60):
+    """
+    Downloads a file with parallel byte-range requests, each writing its part of the file in place.
+
+    Args:
+        session (requests.Session): The HTTP session used to make the requests.
+        url (str): The URL of the file.
+        file_path (str): The path where the file will be saved.
+        size (int): The size of the file in bytes.
+        parts (int): The number of ranges fetched in parallel.
+        rate_limiter (RateLimiter, optional): The rate limiter applied before each request. Defaults to None.
+        timeout (int, optional): The request timeout in seconds. Defaults to 60.
+
+    Raises:
+        requests.RequestException: If a range cannot be downloaded completely.
+    """
+    with open(file_path, "wb") as file:
+        file.truncate(size)
+
+    def fetch_range(start, end):
+        if rate_limiter:
+            rate_limiter.wait(url)
+        with session.get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True, timeout=timeout) as response, \
+                open(file_path, "r+b") as file:
+            if response.status_code != 206:
+                raise requests.HTTPError(f"Range request failed (status {response.status_code})", response=response)
+            file.seek(start)
+            received = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                file.write(chunk)
+                received += len(chunk)
+            if received != end - start + 1:
+                raise requests.RequestException(f"Range {start}-{end} incomplete ({received} bytes)")
+
+    bounds = [size * part // parts for part in range(parts + 1)]
+    with ThreadPoolExecutor(max_workers=parts, thread_name_prefix="range") as executor:
+        for future in [executor.submit(fetch_range, start, end - 1) for start, end in zip(bounds[:-1], bounds[1:])]:
+            future.result()
+
+
+def is_transient_failure(status):
+    """
+    Tells whether a failed download is worth retrying later.
+
+    Args:
+        status (int): The HTTP status of the failed download, or None for a network error or an invalid file.
+
+    Returns:
+        bool: True for throttling, server errors, network errors and invalid files; False for other statuses (e.g. 404).
+    """
+    return status is None or status in THROTTLE_STATUS_CODES
+
+
+def download_file(session, url, file_path, rate_limiter=None, timeout=60, backoff=None, range_parts=0, errors=None):
+    """
+    Downloads a file over HTTP and saves it to the given path.
+
+    Args:
+        session (requests.Session): The HTTP session used to make the request.
+        url (str): The URL of the file.
+        file_path (str): The path where the file will be saved.
+        rate_limiter (RateLimiter, optional): The rate limiter applied before the request. Defaults to None.
+        timeout (int, optional): The request timeout in seconds. Defaults to 60.
+        backoff (AdaptiveBackoff, optional): The backoff applied before the request and updated with its outcome. Defaults to None.
+        range_parts (int, optional): The number of parallel byte-range requests used for files of at least RANGE_MIN_SIZE bytes,
+            when the server supports them. 0 or 1 disables range requests. Defaults to 0.
+        errors (dict, optional): If the download fails, its HTTP status is stored in it under file_path
+            (None for a network error or an invalid file). Defaults to None.
+
+    Returns:
+        str: The SHA-256 checksum of the saved file, or None if the download failed.
+    Comments:
+        The body is streamed in CHUNK_SIZE chunks to <file_path>.part, so memory use does not depend on the file size.
+        The file is checked against the Content-Length header and validated as a PDF or XML file (see validate_download)
+        before it is renamed into place, so a truncated or corrupt download never replaces a good file.
+    """
+    if backoff:
+        backoff.wait()
+    if rate_limiter:
+        rate_limiter.wait(url)
+
+    file_extension = os.path.splitext(file_path)[1]
+    stage_name = {".pdf": "pdf_fetch", ".xml": "alto_fetch"}.get(file_extension, "file_fetch")
+    temp_path = file_path + PARTIAL_SUFFIX
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with stage(stage_name, url=url), session.get(url, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                print(f"Failed to download {url} (status {response.status_code})")
+                if backoff and response.status_code in THROTTLE_STATUS_CODES:
+                    backoff.on_error(parse_retry_after(response))
+                if errors is not None:
+                    errors[file_path] = response.status_code
+                return None
+
+            content_length = response.headers.get("Content-Length")
+            expected_size = int(content_length) if content_length and content_length.isdigit() else None
+            if response.headers.get("Content-Encoding", "identity") != "identity":
+                expected_size = None  # the header counts compressed bytes
+
+            if (range_parts > 1 and expected_size and expected_size >= RANGE_MIN_SIZE
+                    and response.headers.get("Accept-Ranges") == "bytes"):
+                response.close()
+                fetch_ranges(session, url, temp_path, expected_size, range_parts, rate_limiter, timeout)
+                with open(temp_path, "rb") as file:
+                    while chunk := file.read(CHUNK_SIZE):
+                        digest.update(chunk)
+                        size += len(chunk)
+            else:
+                with open(temp_path, "wb") as file:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        file.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+    except (requests.RequestException, OSError) as e:
+        print(f"Error downloading {url}: {str(e)}")
+        if backoff:
+            backoff.on_error()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if errors is not None:
+            errors[file_path] = None
+        return None
+
+    if expected_size is not None and size != expected_size:
+        error = f"received {size} of {expected_size} bytes"
+    else:
+        error = validate_download(temp_path)
+    if error:
+        print(f"Discarding download of {url}: {error}")
+        os.remove(temp_path)
+        if errors is not None:
+            errors[file_path] = None
+        return None
+
+    if backoff:
+        backoff.on_success()
+
+    os.replace(temp_path, file_path)
+    timer.record_download(size, page=file_extension == ".pdf")
+    return digest.hexdigest()
+
+
+class ConcurrentFetcher:
+    """
+    Downloads files in parallel over a shared, pooled HTTP session.
+
+    Args:
+        max_workers (int, optional): The maximum number of concurrent downloads. Defaults to DEFAULT_MAX_WORKERS.
+        requests_per_second (float, optional): The maximum number of requests per second per host. Defaults to DEFAULT_REQUESTS_PER_SECOND.
+        session (requests.Session, optional): The HTTP session to use. Defaults to a new pooled session.
+        rate_limiter (RateLimiter, optional): A rate limiter shared with other fetchers. Defaults to a new one capped at requests_per_second.
+        backoff (AdaptiveBackoff, optional): A backoff shared with other fetchers, slowing down downloads while the site returns errors. Defaults to None.
+        range_parts (int, optional): The number of parallel byte-range requests used for large files, see download_file. Defaults to 0 (disabled).
+        on_file (callable, optional): Called with the path of every file downloaded successfully, from the worker thread
+            that downloaded it. Defaults to None.
+        cache (ResponseCache, optional): A cache for the responses of the new session, see http_cache.py. Defaults to None.
+    Comments:
+        Use it as a context manager so the worker threads and the session are closed when done.
+        A slow on_file callback holds up its worker thread, which slows down the downloads (see pipeline.py).
+        The HTTP status of each failed download is kept in the 'errors' dict, keyed by file path, until it is popped.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, requests_per_second=DEFAULT_REQUESTS_PER_SECOND, session=None,
+                 rate_limiter=None, backoff=None, range_parts=0, on_file=None, cache=None):
+        self.session = session or create_session(max_workers, cache)
+        self.rate_limiter = rate_limiter or RateLimiter(requests_per_second)
+        self.backoff = backoff
+        self.range_parts = range_parts
+        self.on_file = on_file
+        self.errors = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetcher")
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def submit(self, url, file_path, track=True):
+        """
+        Schedules the download of a file.
+
+        Args:
+            url (str): The URL of the file.
+            file_path (str): The path where the file will be saved.
+            track (bool, optional): Whether wait() waits for this download. Defaults to True.
+
+        Returns:
+            Future: A future resolving to the SHA-256 checksum of the file if it was downloaded successfully, None otherwise.
+        """
+        future = self.executor.submit(download_file, self.session, url, file_path, self.rate_limiter,
+                                      backoff=self.backoff, range_parts=self.range_parts, errors=self.errors)
+        if self.on_file:
+            future.add_done_callback(lambda done: done.result() and self.on_file(file_path))
+        if track:
+            with self.lock:
+                self.pending.append(future)
+        return future
+
+    def wait(self):
+        """
+        Waits for all scheduled downloads to finish.
+
+        Returns:
+            int: The number of downloads that failed.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, []
+        wait(pending)
+        return sum(1 for future in pending if not future.result())
+
+    def fetch_all(self, jobs):
+        """
+        Downloads a batch of files in parallel and waits for all of them.
+
+        Args:
+            jobs (list): (url, file_path) tuples of the files to download.
+
+        Returns:
+            list: The checksum of each downloaded file, or None for each failed download, in the order of the jobs.
+        Comments:
+            Only the downloads of this batch are waited for, so several threads can share the fetcher.
+        """
+        futures = [self.submit(url, file_path, track=False) for url, file_path in jobs]
+        wait(futures)
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
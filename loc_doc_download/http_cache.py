@@ -0,0 +1,340 @@
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.exceptions import HTTPError as Urllib3Error
+import requests
+import threading
+import json
+import tempfile
+import hashlib
+import sqlite3
+import time
+import os
+
+# Name of the cache folder, stored in the downloads folder
+CACHE_FOLDERNAME = "http_cache"
+
+# Default cap on the total size of the cached bodies
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Content types cached by default: item and search JSON and ALTO XML. PDFs are not cached, and neither are HTML pages,
+# since loc.gov serves its "technical difficulties" page as HTML with status 200.
+DEFAULT_CONTENT_TYPES = ("application/json", "text/xml", "application/xml")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class OfflineCacheMiss(requests.ConnectionError):
+    """
+    Raised in offline mode for a URL that is not in the cache.
+    """
+
+
+class ResponseCache:
+    """
+    A local cache of HTTP responses, keyed by URL, with a cap on its total size.
+
+    Args:
+        directory (str): The folder of the cache. It is created if it does not exist.
+        max_bytes (int, optional): The maximum total size of the cached bodies. Least recently used responses are evicted
+            beyond it. Defaults to DEFAULT_MAX_BYTES.
+        offline (bool, optional): Whether to serve responses from the cache only, without any request. Defaults to False.
+        max_age (float, optional): The number of seconds during which a cached response is served without revalidating it.
+            Defaults to 0 (always revalidate).
+        content_types (tuple, optional): The content types to cache; None caches every response. Defaults to DEFAULT_CONTENT_TYPES.
+    Comments:
+        Bodies are stored as files in the cache folder, and their URL, size, validators (ETag, Last-Modified) and last use
+        are stored in an SQLite index. The cache is used through a session created with fetcher.create_session(cache=...),
+        whose CachingAdapter sends conditional requests and serves 304 Not Modified responses from the cache.
+        The cache may be shared between threads.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, offline=False, max_age=0, content_types=DEFAULT_CONTENT_TYPES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.max_age = max_age
+        self.content_types = content_types
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def lookup(self, url):
+        """
+        Finds the cached response of a URL.
+
+        Args:
+            url (str): The URL, including its query string.
+
+        Returns:
+            dict: The path, size, content_type, etag, last_modified and stored_at of the response, or None if it is not cached.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT path, size, content_type, etag, last_modified, stored_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(("path", "size", "content_type", "etag", "last_modified", "stored_at"), row))
+        if not os.path.exists(entry["path"]) or os.path.getsize(entry["path"]) != entry["size"]:
+            self.remove(url)
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return self.max_age and time.time() - entry["stored_at"] < self.max_age
+
+    def should_store(self, response):
+        if response.status_code != 200 or "no-store" in response.headers.get("Cache-Control", ""):
+            return False
+        if self.content_types is None:
+            return True
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        return content_type in self.content_types
+
+    def touch(self, url):
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+
+    def refresh(self, url, headers):
+        """
+        Records that a cached response was revalidated, updating its validators and storage time.
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE responses SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+                "stored_at = ?, accessed_at = ? WHERE url = ?",
+                (headers.get("ETag"), headers.get("Last-Modified"), now, now, url),
+            )
+
+    def body_path(self, url):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def new_body_file(self):
+        return tempfile.NamedTemporaryFile(dir=self.directory, prefix="body-", suffix=".tmp", delete=False)
+
+    def store(self, url, headers, temp_path):
+        """
+        Adds a downloaded body to the cache, replacing any earlier response of the URL, and evicts old responses.
+
+        Args:
+            url (str): The URL of the response.
+            headers (dict): The headers of the response.
+            temp_path (str): The file holding the body. It is moved into the cache.
+        """
+        path = self.body_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+        now = time.time()
+        content_type = headers.get("Content-Type")
+
+        with self.lock, self.connection:
+            row = self.connection.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (url, path, size, content_type, etag, last_modified, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, path, size, content_type, headers.get("ETag"), headers.get("Last-Modified"), now, now),
+            )
+            self.total_bytes += size - (row[0] if row else 0)
+            self.stats["stored"] += 1
+        self.evict()
+
+    def remove(self, url):
+        with self.lock, self.connection:
+            row = self.connection.execute("SELECT path, size FROM responses WHERE url = ?", (url,)).fetchone()
+            if row:
+                self.connection.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self.total_bytes -= row[1]
+        if row and os.path.exists(row[0]):
+            os.remove(row[0])
+
+    def evict(self):
+        """
+        Removes the least recently used responses until the cache fits in max_bytes.
+        """
+        while True:
+            with self.lock:
+                if self.total_bytes <= self.max_bytes:
+                    return
+                row = self.connection.execute("SELECT url FROM responses ORDER BY accessed_at LIMIT 1").fetchone()
+            if row is None:
+                return
+            self.remove(row[0])
+            self.count("evicted")
+
+    def summary(self):
+        """
+        Summarizes the use of the cache.
+
+        Returns:
+            dict: The number of hits, revalidated responses, misses, stored and evicted responses, and the size of the cache.
+        """
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {**self.stats, "entries": entries, "bytes": self.total_bytes}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CachingBody:
+    """
+    Wraps the body of a live response so that everything read from it is also written to the cache.
+    The body is stored once it has been read to the end, and only if it has the size announced by Content-Length
+    and, for JSON responses, if it is valid JSON.
+    """
+
+    def __init__(self, raw, cache, url, headers):
+        self.raw = raw
+        self.cache = cache
+        self.url = url
+        self.headers = headers
+        self.file = cache.new_body_file()
+        self.size = 0
+        self.done = False
+
+    def read(self, amt=None, **kwargs):
+        try:
+            chunk = self.raw.read(amt, decode_content=True)
+        except Urllib3Error as e:
+            self.discard()
+            raise requests.ConnectionError(e)
+        if chunk:
+            self.file.write(chunk)
+            self.size += len(chunk)
+        elif not self.done:
+            self.finish()
+        return chunk
+
+    def finish(self):
+        self.done = True
+        self.file.close()
+        expected_size = self.headers.get("Content-Length")
+        compressed = self.headers.get("Content-Encoding", "identity") != "identity"
+        if expected_size and expected_size.isdigit() and not compressed and int(expected_size) != self.size:
+            os.remove(self.file.name)
+            return
+        if not self.is_valid():
+            os.remove(self.file.name)
+            return
+        self.cache.store(self.url, self.headers, self.file.name)
+
+    def is_valid(self):
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            return True
+        try:
+            with open(self.file.name, "rb") as f:
+                json.load(f)
+        except ValueError:
+            return False
+        return True
+
+    def discard(self):
+        if not self.done:
+            self.done = True
+            self.file.close()
+            os.remove(self.file.name)
+
+    def close(self):
+        self.discard()
+        self.raw.close()
+
+    def release_conn(self):
+        self.raw.release_conn()
+
+
+class CachingAdapter(HTTPAdapter):
+    """
+    An HTTP adapter that serves GET requests from a ResponseCache.
+
+    Args:
+        cache (ResponseCache): The cache.
+        **kwargs: The arguments of requests.adapters.HTTPAdapter, e.g. pool_maxsize.
+    Comments:
+        A cached response is revalidated with If-None-Match / If-Modified-Since; a 304 Not Modified answer is served
+        from the cache. Responses read from the cache have a 'from_cache' attribute set to True.
+        Range requests are never cached.
+    """
+
+    def __init__(self, cache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def cached_response(self, request, entry):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict({"Content-Length": str(entry["size"])})
+        for name, key in (("Content-Type", "content_type"), ("ETag", "etag"), ("Last-Modified", "last_modified")):
+            if entry[key]:
+                response.headers[name] = entry[key]
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = open(entry["path"], "rb")
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        self.cache.touch(request.url)
+        return response
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if request.method != "GET" or "Range" in request.headers:
+            return super().send(request, stream, timeout, verify, cert, proxies)
+
+        entry = self.cache.lookup(request.url)
+        if self.cache.offline:
+            if entry is None:
+                self.cache.count("misses")
+                raise OfflineCacheMiss(f"{request.url} is not in the cache (offline mode)", request=request)
+            self.cache.count("hits")
+            return self.cached_response(request, entry)
+        if entry and self.cache.is_fresh(entry):
+            self.cache.count("hits")
+            return self.cached_response(request, entry)
+
+        if entry and entry["etag"]:
+            request.headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = super().send(request, stream, timeout, verify, cert, proxies)
+        if response.status_code == 304 and entry:
+            response.close()
+            self.cache.refresh(request.url, response.headers)
+            self.cache.count("revalidated")
+            return self.cached_response(request, entry)
+
+        self.cache.count("misses")
+        if self.cache.should_store(response):
+            response.raw = CachingBody(response.raw, self.cache, request.url, response.headers)
+        return response
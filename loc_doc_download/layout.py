@@ -0,0 +1,118 @@
+import numpy as np
+
+# Number of horizontal bins each page is divided into when looking for columns
+COLUMN_BINS = 400
+
+# A bin is a gutter between columns when its text coverage is below this fraction of the page's highest coverage
+GUTTER_THRESHOLD = 0.2
+
+# Fraction of a block's width ignored on each side when checking whether it crosses a gutter
+SPAN_MARGIN = 0.15
+
+
+def as_boxes(boxes):
+    """
+    Converts boxes to a float array of shape (n, 4).
+
+    Args:
+        boxes (array-like): HPOS, VPOS, WIDTH, HEIGHT of each box.
+
+    Returns:
+        numpy.ndarray: The boxes.
+    """
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+
+def reading_order_batch(pages):
+    """
+    Computes the reading order of the text blocks of many pages at once.
+
+    Args:
+        pages (list): One dict per page with:
+            - 'blocks': the HPOS, VPOS, WIDTH, HEIGHT of each TextBlock, shape (n, 4),
+            - 'lines' (optional): the HPOS, VPOS, WIDTH, HEIGHT of each TextLine, shape (m, 4). Defaults to the blocks.
+            - 'width' (optional): the width of the page. Defaults to the right edge of the rightmost box.
+
+    Returns:
+        list: For each page, an array of block indexes in reading order.
+    Comments:
+        All pages are stacked into flat arrays and processed together, without a Python loop over blocks:
+        1. The lines of each page are projected onto COLUMN_BINS horizontal bins, each adding its height to the
+           bins it covers (a difference array summed with cumsum).
+        2. Bins whose coverage is below GUTTER_THRESHOLD of the page maximum are gutters; every run of text bins
+           after a gutter starts a new column.
+        3. A block whose left and right edges fall in different columns spans them (e.g. a headline). Spanning blocks
+           split the page into horizontal bands, which are read top to bottom.
+        4. Within a band, the spanning block comes first, then the other blocks column by column, top to bottom.
+        Boxes with missing coordinates (NaN) are kept, and sorted after the others.
+    """
+    if not pages:
+        return []
+
+    blocks = [as_boxes(page["blocks"]) for page in pages]
+    lines = [as_boxes(page["lines"]) if page.get("lines") is not None and len(page["lines"]) else block
+             for page, block in zip(pages, blocks)]
+    block_counts = np.array([len(block) for block in blocks])
+    line_counts = np.array([len(line) for line in lines])
+    block_page = np.repeat(np.arange(len(pages)), block_counts)
+    line_page = np.repeat(np.arange(len(pages)), line_counts)
+    all_blocks = np.concatenate(blocks)
+    all_lines = np.concatenate(lines)
+
+    # Page widths, defaulting to the rightmost edge of each page's boxes
+    right_edges = np.zeros(len(pages))
+    finite = np.isfinite(all_lines).all(axis=1)
+    np.maximum.at(right_edges, line_page[finite], all_lines[finite, 0] + all_lines[finite, 2])
+    widths = np.array([page.get("width") or 0 for page in pages], dtype=np.float64)
+    widths = np.where(np.isfinite(widths) & (widths > 0), widths, right_edges)
+    widths[widths <= 0] = 1.0
+
+    # Coverage of each bin by line heights, as a difference array per page
+    def to_bin(x, page):
+        return np.clip((x / widths[page] * COLUMN_BINS).astype(np.int64), 0, COLUMN_BINS - 1)
+
+    line_page, all_lines = line_page[finite], all_lines[finite]
+    coverage = np.zeros((len(pages), COLUMN_BINS + 1))
+    np.add.at(coverage, (line_page, to_bin(all_lines[:, 0], line_page)), all_lines[:, 3])
+    np.add.at(coverage, (line_page, to_bin(all_lines[:, 0] + all_lines[:, 2], line_page) + 1), -all_lines[:, 3])
+    coverage = np.cumsum(coverage[:, :COLUMN_BINS], axis=1)
+
+    # Column number of each bin: the number of text runs that start at or before it
+    text = coverage > GUTTER_THRESHOLD * coverage.max(axis=1, keepdims=True)
+    starts = text & ~np.concatenate([np.zeros((len(pages), 1), dtype=bool), text[:, :-1]], axis=1)
+    columns = np.cumsum(starts, axis=1)
+
+    # Column of each block and whether it spans several columns
+    known = np.isfinite(all_blocks).all(axis=1)
+    boxes = np.where(known[:, None], all_blocks, 0.0)
+    margin = boxes[:, 2] * SPAN_MARGIN
+    left = columns[block_page, to_bin(boxes[:, 0] + margin, block_page)]
+    right = columns[block_page, to_bin(boxes[:, 0] + boxes[:, 2] - margin, block_page)]
+    column = columns[block_page, to_bin(boxes[:, 0] + boxes[:, 2] / 2, block_page)]
+    spanning = known & (right > left)
+
+    # Band of each block: the number of spanning blocks of its page starting at or above it
+    page_height = boxes[:, 1].max(initial=0.0) + boxes[:, 3].max(initial=0.0) + 1.0
+    keys = block_page * page_height + boxes[:, 1]
+    spanner_keys = np.sort(keys[spanning])
+    band = (np.searchsorted(spanner_keys, keys, side="right")
+            - np.searchsorted(spanner_keys, block_page * page_height, side="left"))
+
+    order = np.lexsort((np.arange(len(all_blocks)), boxes[:, 1], column, ~spanning, band, ~known, block_page))
+    offsets = np.concatenate([[0], np.cumsum(block_counts)])
+    return [order[start:end] - start for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def reading_order(blocks, lines=None, width=None):
+    """
+    Computes the reading order of the text blocks of one page. See reading_order_batch.
+
+    Args:
+        blocks (array-like): The HPOS, VPOS, WIDTH, HEIGHT of each TextBlock, shape (n, 4).
+        lines (array-like, optional): The HPOS, VPOS, WIDTH, HEIGHT of each TextLine. Defaults to the blocks.
+        width (float, optional): The width of the page. Defaults to the right edge of the rightmost box.
+
+    Returns:
+        numpy.ndarray: The block indexes in reading order.
+    """
+    return reading_order_batch([{"blocks": blocks, "lines": lines, "width": width}])[0]
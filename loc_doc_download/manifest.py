@@ -0,0 +1,205 @@
+import sqlite3
+import threading
+import hashlib
+import time
+import os
+
+# Name of the manifest database, stored in the root of the downloads folder
+MANIFEST_FILENAME = "manifest.sqlite"
+
+# States of issues and files in the manifest
+STATE_PENDING = "pending"
+STATE_COMPLETE = "complete"
+STATE_FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    url TEXT PRIMARY KEY,
+    folder TEXT,
+    state TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    issue_url TEXT NOT NULL,
+    page TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    url TEXT,
+    state TEXT NOT NULL,
+    size INTEGER,
+    sha256 TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_issue ON files (issue_url);
+"""
+
+
+def file_checksum(file_path, chunk_size=1024 * 1024):
+    """
+    Computes the SHA-256 checksum of a file.
+
+    Args:
+        file_path (str): The path of the file.
+        chunk_size (int, optional): The number of bytes read at a time. Defaults to 1 MiB.
+
+    Returns:
+        str: The hexadecimal checksum.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Persistent record of the issues and files of a download run, backed by SQLite.
+
+    Args:
+        path (str): The path of the manifest database. It is created if it does not exist.
+    Comments:
+        Every issue and every page file is recorded with its state, and files also with their byte size and checksum.
+        A restarted run uses the manifest to skip completed work and to retry only failed or partial files.
+        The manifest may be shared between threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    def start_issue(self, url, folder=None):
+        """
+        Records that an issue is being downloaded.
+
+        Args:
+            url (str): The URL of the issue.
+            folder (str, optional): The folder where the issue is saved. Defaults to None.
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO issues (url, folder, state, started_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET folder = COALESCE(excluded.folder, folder), state = excluded.state, updated_at = excluded.updated_at",
+                (url, folder, STATE_PENDING, now, now),
+            )
+
+    def finish_issue(self, url, complete=True):
+        """
+        Records that an issue has been processed.
+
+        Args:
+            url (str): The URL of the issue.
+            complete (bool, optional): Whether all files of the issue were downloaded. Defaults to True.
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE issues SET state = ?, updated_at = ? WHERE url = ?",
+                (STATE_COMPLETE if complete else STATE_FAILED, time.time(), url),
+            )
+
+    def is_issue_complete(self, url):
+        """
+        Checks whether an issue was fully downloaded.
+
+        Args:
+            url (str): The URL of the issue.
+
+        Returns:
+            bool: True if the issue is recorded as complete, False otherwise.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT state FROM issues WHERE url = ?", (url,)).fetchone()
+        return row is not None and row[0] == STATE_COMPLETE
+
+    def last_incomplete_issue(self, url_prefix=""):
+        """
+        Finds the most recently updated issue that was not fully downloaded, i.e. where an interrupted run stopped.
+
+        Args:
+            url_prefix (str, optional): Only consider issues whose URL starts with this prefix, e.g. the item URLs of one title. Defaults to "".
+
+        Returns:
+            str: The URL of the issue, or None if every recorded issue is complete.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT url FROM issues WHERE state != ? AND substr(url, 1, ?) = ? ORDER BY updated_at DESC LIMIT 1",
+                (STATE_COMPLETE, len(url_prefix), url_prefix),
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_file(self, path, issue_url, page, file_type, url=None, error=None, sha256=None):
+        """
+        Records the outcome of a file download.
+
+        Args:
+            path (str): The path of the downloaded file.
+            issue_url (str): The URL of the issue the file belongs to.
+            page (str): The page number.
+            file_type (str): The type of the file, e.g. 'PDF' or 'OCR(ALTO)'.
+            url (str, optional): The URL the file was downloaded from. Defaults to None.
+            error (str, optional): The error message if the download failed. Defaults to None.
+            sha256 (str, optional): The checksum computed while downloading the file. Defaults to None (read the file to compute it).
+        Comments:
+            If the file exists and no error is given, its size and checksum are recorded and it is marked complete.
+            Otherwise it is marked failed.
+        """
+        size = None
+        state = STATE_FAILED
+        if error is None and os.path.exists(path):
+            size = os.path.getsize(path)
+            sha256 = sha256 or file_checksum(path)
+            state = STATE_COMPLETE
+        else:
+            sha256 = None
+            error = error or "File not found"
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (path, issue_url, page, file_type, url, state, size, sha256, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, issue_url, str(page), file_type, url, state, size, sha256, error, time.time()),
+            )
+
+    def is_file_complete(self, path):
+        """
+        Checks whether a file was fully downloaded and is still intact on disk.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            bool: True if the file is recorded as complete and its size on disk matches the recorded size, False otherwise.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT state, size FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None or row[0] != STATE_COMPLETE:
+            return False
+        return os.path.exists(path) and os.path.getsize(path) == row[1]
+
+    def summary(self):
+        """
+        Counts the recorded issues and files by state.
+
+        Returns:
+            dict: {'issues': {state: count}, 'files': {state: count}}.
+        """
+        with self.lock:
+            issues = dict(self.connection.execute("SELECT state, COUNT(*) FROM issues GROUP BY state").fetchall())
+            files = dict(self.connection.execute("SELECT state, COUNT(*) FROM files GROUP BY state").fetchall())
+        return {"issues": issues, "files": files}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,260 @@
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+import argparse
+import threading
+import queue
+import time
+import os
+
+from .download_api import download_newspaper_pages_api
+from .fetcher import DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND
+from .scheduler import download_titles
+from .search_index import SearchIndex, INDEX_FILENAME
+from .transcribe_pages import transcribe_page, find_pages_to_transcribe, get_text_path, get_available_cores
+from .timing import stage
+
+# Default number of downloaded pages waiting for transcription before the downloaders are held up
+DEFAULT_QUEUE_SIZE = 64
+
+# Seconds between checks that the consumer thread is still running, while waiting for room in a full queue
+QUEUE_POLL_INTERVAL = 1.0
+
+
+class TranscriptionPipeline:
+    """
+    Transcribes pages while they are being downloaded.
+
+    Args:
+        downloads_root (str, optional): The root folder of the downloads. Defaults to ./downloads.
+        workers (int, optional): The number of transcription processes. Defaults to the number of available cores.
+        queue_size (int, optional): The number of pages that may wait for transcription. Defaults to DEFAULT_QUEUE_SIZE.
+        reorder (bool, optional): Whether to write the blocks of each page in reading order, see transcribe_pages.py. Defaults to True.
+    Comments:
+        Pass file_downloaded as the on_file callback of a downloader. As soon as both page_N.pdf and page_N.xml of a page
+        are in place, the page is put in a bounded queue, and a consumer thread hands it to a pool of transcription processes.
+        When the queue is full, file_downloaded blocks, which holds up the download thread that called it:
+        downloads slow down to the pace of transcription instead of piling up untranscribed pages.
+        Transcribed pages are added to the search index in the downloads folder.
+        Use it as a context manager; leaving it waits for the queued pages to be transcribed.
+        If a transcription process dies (e.g. out of memory on a large page), its pages are counted as failed and the
+        process pool is restarted. If the consumer thread stops on an error, pages are no longer queued and the
+        downloads carry on untranscribed; run the transcribe command afterwards to catch up.
+    """
+
+    def __init__(self, downloads_root=None, workers=None, queue_size=DEFAULT_QUEUE_SIZE, reorder=True):
+        self.downloads_root = downloads_root or os.path.join(os.getcwd(), "downloads")
+        os.makedirs(self.downloads_root, exist_ok=True)
+        self.workers = workers or get_available_cores()
+        self.reorder = reorder
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.queued = set()
+        self.done = 0
+        self.failed = 0
+        self.error = None
+        self.stopped = threading.Event()
+        self.start_time = time.monotonic()
+        self.consumer = threading.Thread(target=self.consume, name="transcription")
+        self.consumer.start()
+
+    def file_downloaded(self, file_path):
+        """
+        Queues the page of a downloaded file for transcription, once both its PDF and its ALTO file are in place.
+
+        Args:
+            file_path (str): The path of the downloaded page_N.pdf or page_N.xml file.
+
+        Returns:
+            bool: True if the page was queued, False if it is still missing a file or was already queued.
+        """
+        base_path, file_extension = os.path.splitext(file_path)
+        if file_extension not in (".pdf", ".xml"):
+            return False
+        return self.add_page(base_path + ".pdf", base_path + ".xml")
+
+    def add_page(self, pdf_path, alto_path):
+        """
+        Queues a page for transcription, blocking while the queue is full.
+
+        Args:
+            pdf_path (str): The path of the page's PDF.
+            alto_path (str): The path of the page's ALTO file.
+
+        Returns:
+            bool: True if the page was queued, False if a file is missing, the page was already queued or transcription has stopped.
+        """
+        if self.stopped.is_set() or not (os.path.exists(pdf_path) and os.path.exists(alto_path)):
+            return False
+        with self.lock:
+            if pdf_path in self.queued:
+                return False
+            self.queued.add(pdf_path)
+        with stage("transcription_queue_wait", page=os.path.basename(pdf_path)):
+            return self.put((pdf_path, alto_path))
+
+    def put(self, item):
+        """
+        Puts an item in the queue, blocking while it is full, unless the consumer thread has stopped.
+
+        Returns:
+            bool: True if the item was queued, False if the consumer thread has stopped.
+        """
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=QUEUE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def add_unfinished_pages(self):
+        """
+        Queues the pages of the downloads folder that are downloaded but not transcribed, e.g. by an earlier run.
+
+        Returns:
+            int: The number of pages queued.
+        """
+        queued = 0
+        for publication_folder in sorted(os.listdir(self.downloads_root)):
+            publication_path = os.path.join(self.downloads_root, publication_folder)
+            if os.path.isdir(publication_path):
+                for pdf_path, alto_path in find_pages_to_transcribe(publication_path):
+                    if self.add_page(pdf_path, alto_path):
+                        queued += 1
+        return queued
+
+    def finish_page(self, future, pdf_path, index):
+        try:
+            future.result()
+            self.done += 1
+            index.update_page(get_text_path(pdf_path))
+        except Exception as e:
+            self.failed += 1
+            print(f"Error transcribing {pdf_path}: {str(e)}")
+            return
+        elapsed = time.monotonic() - self.start_time
+        print(f"Transcribed {os.path.relpath(pdf_path, self.downloads_root)} "
+              f"({self.done} pages, {self.done / elapsed:.2f} pages/s, {self.queue.qsize()} waiting)")
+
+    def consume(self):
+        try:
+            # The index is opened in this thread, which is the only one using its SQLite connection
+            with SearchIndex(os.path.join(self.downloads_root, INDEX_FILENAME)) as index:
+                self.transcribe_queued_pages(index)
+        except Exception as e:
+            self.error = e
+            print(f"Transcription stopped: {e!r}")
+        finally:
+            # Release the producers: they stop queueing pages instead of waiting for room forever
+            self.stopped.set()
+
+    def transcribe_queued_pages(self, index):
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        running = {}
+        try:
+            while True:
+                page = self.queue.get()
+                if page is None:
+                    break
+
+                # Take a page from the queue only when a worker is free, so that a full queue holds up the downloaders
+                while len(running) >= self.workers:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self.finish_page(future, running.pop(future), index)
+
+                pdf_path, alto_path = page
+                try:
+                    future = executor.submit(transcribe_page, pdf_path, alto_path, self.reorder)
+                except BrokenProcessPool:
+                    print("A transcription process died (e.g. out of memory), restarting the pool")
+                    for future in wait(running).done:
+                        self.finish_page(future, running[future], index)
+                    running.clear()
+                    executor.shutdown()
+                    executor = ProcessPoolExecutor(max_workers=self.workers)
+                    future = executor.submit(transcribe_page, pdf_path, alto_path, self.reorder)
+                running[future] = pdf_path
+
+            for future in wait(running).done:
+                self.finish_page(future, running[future], index)
+        finally:
+            executor.shutdown()
+
+    def close(self):
+        """
+        Waits for the queued pages to be transcribed, and stops the workers.
+        """
+        self.put(None)
+        self.consumer.join()
+        elapsed = time.monotonic() - self.start_time
+        print(f"Transcribed {self.done} pages in {elapsed:.1f}s, {self.failed} failed")
+        if self.error:
+            print(f"Transcription stopped early ({self.error!r}); run the transcribe command to transcribe the remaining pages")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def download_and_transcribe(url, engine="api", downloads_root=None, workers=None, queue_size=DEFAULT_QUEUE_SIZE, reorder=True,
+                            cache=None, end_date=None, download_workers=DEFAULT_MAX_WORKERS,
+                            requests_per_second=DEFAULT_REQUESTS_PER_SECOND, range_parts=0):
+    """
+    Downloads a newspaper and transcribes its pages while the download is still running.
+
+    Args:
+        url (str): The first issue to download (for the 'api' and 'browser' engines), or a title as accepted by
+            scheduler.parse_title_spec (for the 'scheduler' engine).
+        engine (str, optional): 'api' (download_api.py), 'scheduler' (scheduler.py) or 'browser' (download_pages.py). Defaults to 'api'.
+        downloads_root (str, optional): The root folder of the downloads. Defaults to ./downloads (always, for the 'browser' engine).
+        workers (int, optional): The number of transcription processes. Defaults to the number of available cores.
+        queue_size (int, optional): The number of pages that may wait for transcription. Defaults to DEFAULT_QUEUE_SIZE.
+        reorder (bool, optional): Whether to write the blocks of each page in reading order. Defaults to True.
+        cache (ResponseCache, optional): A cache for the HTTP responses (issue lists, item JSON, ALTO files), see http_cache.py. Defaults to None.
+        end_date (str, optional): The last issue date to download, formatted as YYYY-MM-DD ('api' engine). Defaults to None.
+        download_workers (int, optional): The number of concurrent downloads ('api') or issues ('scheduler'). Defaults to DEFAULT_MAX_WORKERS.
+        requests_per_second (float, optional): The maximum number of requests per second sent to the site ('api' and 'scheduler').
+            Defaults to DEFAULT_REQUESTS_PER_SECOND.
+        range_parts (int, optional): The number of parallel byte-range requests per large PDF ('api' engine). Defaults to 0 (disabled).
+
+    Returns:
+        int: The number of pages transcribed.
+    Comments:
+        Pages downloaded by earlier runs but not yet transcribed are transcribed too, after the download finishes.
+    """
+    if engine not in ("api", "scheduler", "browser"):
+        raise ValueError(f"Unknown engine: {engine}")
+    if engine == "browser" or not downloads_root:
+        # download_pages.py always saves to ./downloads
+        downloads_root = os.path.join(os.getcwd(), "downloads")
+
+    with TranscriptionPipeline(downloads_root, workers, queue_size, reorder) as pipeline:
+        if engine == "api":
+            download_newspaper_pages_api(url, downloads_root, end_date, max_workers=download_workers,
+                                         requests_per_second=requests_per_second, range_parts=range_parts,
+                                         on_file=pipeline.file_downloaded, cache=cache)
+        elif engine == "scheduler":
+            download_titles([url], downloads_root, download_workers, requests_per_second,
+                            on_file=pipeline.file_downloaded, cache=cache)
+        else:
+            from .download_pages import download_newspaper_pages
+            download_newspaper_pages(url, on_file=pipeline.file_downloaded, cache=cache)
+
+        pipeline.add_unfinished_pages()
+    return pipeline.done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download a newspaper and transcribe its pages as they arrive.")
+    parser.add_argument("url", help="URL of the first issue, or a title (LCCN[:start[:end]]) with --engine scheduler")
+    parser.add_argument("--engine", choices=["api", "scheduler", "browser"], default="api")
+    parser.add_argument("--downloads", help="Root folder of the downloads (default: ./downloads)")
+    parser.add_argument("--workers", type=int, help="Number of transcription processes (default: one per core)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="Pages waiting for transcription before downloads are held up")
+    parser.add_argument("--no-reorder", action="store_true", help="Keep the blocks of each page in document order")
+    args = parser.parse_args()
+
+    download_and_transcribe(args.url, args.engine, args.downloads, args.workers, args.queue_size, not args.no_reorder)
@@ -0,0 +1,292 @@
+import requests
+import threading
+import sqlite3
+import heapq
+import time
+import os
+
+from .download_api import list_issues, parse_issue_url, download_issue, SiteError, LOC_BASE_URL
+from .fetcher import ConcurrentFetcher, AdaptiveBackoff, DEFAULT_REQUESTS_PER_SECOND
+from .manifest import Manifest, MANIFEST_FILENAME
+from .timing import timer
+
+# Default number of issues downloaded at the same time
+DEFAULT_WORKERS = 4
+
+# Number of concurrent file downloads per issue
+FILES_PER_ISSUE = 4
+
+# Number of times an issue is attempted before it is given up on
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+def parse_title_spec(spec):
+    """
+    Parses a title to download into its LCCN and optional date range.
+
+    Args:
+        spec (str): An LCCN ('sn96086912'), an LCCN with a date range ('sn96086912:1882-01-01:1883-12-31',
+            either date may be empty), or the URL of an issue, which starts the range at that issue.
+
+    Returns:
+        tuple: The (lccn, start_date, end_date) of the title. Missing dates are None.
+
+    Raises:
+        ValueError: If the spec cannot be parsed.
+    """
+    if "/" in spec:
+        lccn, start_date, _ = parse_issue_url(spec)
+        return lccn, start_date, None
+
+    parts = spec.strip().split(":")
+    if len(parts) > 3 or not parts[0]:
+        raise ValueError(f"Invalid title: {spec}")
+    parts += [""] * (3 - len(parts))
+    return parts[0], parts[1] or None, parts[2] or None
+
+
+class DownloadScheduler:
+    """
+    Downloads the issues of many titles with a pool of workers, backing off when the site returns errors.
+
+    Args:
+        downloads_root (str, optional): The root folder of the downloads. Defaults to ./downloads.
+        workers (int, optional): The number of issues downloaded at the same time. Defaults to DEFAULT_WORKERS.
+        requests_per_second (float, optional): The maximum number of requests per second sent to the site. Defaults to DEFAULT_REQUESTS_PER_SECOND.
+        max_attempts (int, optional): The number of times an issue is attempted before it is given up on. Defaults to DEFAULT_MAX_ATTEMPTS.
+        base_url (str, optional): The base URL of the site. Defaults to LOC_BASE_URL.
+        on_file (callable, optional): Called with the path of every file downloaded, e.g. to transcribe pages as they arrive. Defaults to None.
+        cache (ResponseCache, optional): A cache for the HTTP responses (issue lists, item JSON, ALTO files), see http_cache.py. Defaults to None.
+    Comments:
+        Issues are queued by priority (lower first) and then by date. An issue queued twice, for example
+        because two overlapping date ranges of the same title were added, is downloaded only once,
+        and issues the manifest records as complete are not queued at all.
+        When an issue fails because the site is throttling or erroring (SiteError, 429, 5xx, network errors),
+        the shared AdaptiveBackoff slows down every worker and the issue is put back in the queue, to be retried
+        after a jittered delay instead of ending the run. Permanent failures (404, pages without a PDF or ALTO file,
+        unexpected errors) are recorded as failed without a retry and do not slow down the other workers.
+    """
+
+    def __init__(self, downloads_root=None, workers=DEFAULT_WORKERS, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, base_url=LOC_BASE_URL, on_file=None, cache=None):
+        self.downloads_root = downloads_root or os.path.join(os.getcwd(), "downloads")
+        os.makedirs(self.downloads_root, exist_ok=True)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_url = base_url
+
+        self.backoff = AdaptiveBackoff()
+        self.fetcher = ConcurrentFetcher(workers * FILES_PER_ISSUE, requests_per_second, backoff=self.backoff, on_file=on_file,
+                                         cache=cache)
+        self.manifest = Manifest(os.path.join(self.downloads_root, MANIFEST_FILENAME))
+
+        # Each scheduler is a run of its own, with its own timing summary
+        timer.restart()
+
+        self.condition = threading.Condition()
+        self.ready = []  # heap of (priority, date, sequence, issue_url, attempt)
+        self.delayed = []  # heap of (not_before, priority, date, sequence, issue_url, attempt)
+        self.seen = set()
+        self.in_progress = 0
+        self.sequence = 0
+        self.completed = []
+        self.failed = []
+
+    def add_title(self, spec, priority=0):
+        """
+        Queues the issues of a title.
+
+        Args:
+            spec (str): The title, as accepted by parse_title_spec.
+            priority (int, optional): The priority of the issues; lower is downloaded first. Defaults to 0.
+
+        Returns:
+            int: The number of issues queued.
+        """
+        lccn, start_date, end_date = parse_title_spec(spec)
+        issue_urls = self.call_site(lambda: list_issues(self.fetcher.session, lccn, start_date, end_date,
+                                                         self.base_url, self.fetcher.rate_limiter))
+
+        queued = 0
+        for issue_url in issue_urls:
+            if self.add_issue(issue_url, priority):
+                queued += 1
+        print(f"Queued {queued} of {len(issue_urls)} issues of {lccn}")
+        return queued
+
+    def add_issue(self, issue_url, priority=0):
+        """
+        Queues an issue unless it is already queued or downloaded.
+
+        Args:
+            issue_url (str): The item URL of the issue.
+            priority (int, optional): The priority of the issue; lower is downloaded first. Defaults to 0.
+
+        Returns:
+            bool: True if the issue was queued, False otherwise.
+        """
+        with self.condition:
+            if issue_url in self.seen or self.manifest.is_issue_complete(issue_url):
+                return False
+            self.seen.add(issue_url)
+            _, date, _ = parse_issue_url(issue_url)
+            self.sequence += 1
+            heapq.heappush(self.ready, (priority, date, self.sequence, issue_url, 0))
+            self.condition.notify()
+            return True
+
+    def call_site(self, request, max_attempts=None):
+        """
+        Calls the site, backing off and retrying while it returns errors.
+
+        Args:
+            request (callable): A function making the request.
+            max_attempts (int, optional): The number of attempts. Defaults to the scheduler's max_attempts.
+
+        Returns:
+            The return value of the request.
+
+        Raises:
+            SiteError or requests.RequestException: If the last attempt fails.
+        """
+        max_attempts = max_attempts or self.max_attempts
+        for attempt in range(max_attempts):
+            self.backoff.wait()
+            try:
+                result = request()
+                self.backoff.on_success()
+                return result
+            except (SiteError, requests.RequestException) as e:
+                delay = self.backoff.on_error(getattr(e, "retry_after", None))
+                print(f"Site error ({str(e)}), backing off {delay:.0f}s")
+                if attempt + 1 == max_attempts:
+                    raise
+
+    def next_issue(self):
+        """
+        Takes the next issue to download, waiting for delayed issues to become due.
+
+        Returns:
+            tuple: The (priority, date, sequence, issue_url, attempt) of the issue, or None when all work is done.
+        """
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                while self.delayed and self.delayed[0][0] <= now:
+                    heapq.heappush(self.ready, heapq.heappop(self.delayed)[1:])
+                if self.ready:
+                    self.in_progress += 1
+                    return heapq.heappop(self.ready)
+                if not self.delayed and not self.in_progress:
+                    return None
+                timeout = self.delayed[0][0] - now if self.delayed else None
+                self.condition.wait(timeout)
+
+    def finish_issue(self, item, success, retry=False):
+        """
+        Records the outcome of an issue, requeueing it with a delay if it failed with an error worth retrying.
+
+        Args:
+            item (tuple): The queue entry returned by next_issue.
+            success (bool): Whether the issue was downloaded completely.
+            retry (bool, optional): Whether a failed issue should be attempted again. Defaults to False.
+        """
+        priority, date, sequence, issue_url, attempt = item
+        with self.condition:
+            self.in_progress -= 1
+            if success:
+                self.completed.append(issue_url)
+            elif not retry:
+                self.failed.append(issue_url)
+                print(f"Not retrying {issue_url}: its files are missing or the error is permanent")
+            elif attempt + 1 < self.max_attempts:
+                delay = max(self.backoff.delay, self.backoff.base_delay) * 2 ** attempt
+                not_before = time.monotonic() + min(delay, self.backoff.max_delay)
+                heapq.heappush(self.delayed, (not_before, priority, date, sequence, issue_url, attempt + 1))
+                print(f"Requeued {issue_url} (attempt {attempt + 2} of {self.max_attempts})")
+            else:
+                self.failed.append(issue_url)
+                print(f"Giving up on {issue_url} after {self.max_attempts} attempts")
+            self.condition.notify_all()
+
+    def record_failure(self, issue_url):
+        try:
+            self.manifest.start_issue(issue_url)
+            self.manifest.finish_issue(issue_url, complete=False)
+        except sqlite3.Error as e:
+            print(f"Could not record the failure of {issue_url}: {str(e)}")
+
+    def worker(self):
+        while True:
+            item = self.next_issue()
+            if item is None:
+                return
+            issue_url = item[3]
+            success = retry = False
+            try:
+                self.backoff.wait()
+                success = download_issue(self.fetcher, issue_url, self.downloads_root, self.manifest)
+                self.backoff.on_success()  # the site answered, even if the issue lacks files
+            except (SiteError, requests.RequestException) as e:
+                print(f"An error occurred while downloading {issue_url}: {str(e)}")
+                self.backoff.on_error(getattr(e, "retry_after", None))
+                self.record_failure(issue_url)
+                retry = True
+            except Exception as e:
+                print(f"An unexpected error occurred while downloading {issue_url}: {e!r}")
+                self.record_failure(issue_url)
+            finally:
+                # Always release the issue, or the other workers would wait for it forever in next_issue
+                self.finish_issue(item, success, retry)
+
+    def run(self):
+        """
+        Downloads all queued issues and returns when the queue is empty.
+
+        Returns:
+            dict: The URLs of the 'completed' and 'failed' issues.
+        """
+        threads = [threading.Thread(target=self.worker, name=f"scheduler-{i}") for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        print(f"Downloaded {len(self.completed)} issues, {len(self.failed)} failed")
+        timer.print_summary()
+        return {"completed": self.completed, "failed": self.failed}
+
+    def close(self):
+        self.fetcher.close()
+        self.manifest.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def download_titles(specs, downloads_root=None, workers=DEFAULT_WORKERS, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                    on_file=None, cache=None):
+    """
+    Downloads the issues of several titles.
+
+    Args:
+        specs (list): The titles, as accepted by parse_title_spec. Titles listed first are downloaded first.
+        downloads_root (str, optional): The root folder of the downloads. Defaults to ./downloads.
+        workers (int, optional): The number of issues downloaded at the same time. Defaults to DEFAULT_WORKERS.
+        requests_per_second (float, optional): The maximum number of requests per second sent to the site. Defaults to DEFAULT_REQUESTS_PER_SECOND.
+        on_file (callable, optional): Called with the path of every file downloaded. Defaults to None.
+        cache (ResponseCache, optional): A cache for the HTTP responses (issue lists, item JSON, ALTO files), see http_cache.py. Defaults to None.
+
+    Returns:
+        dict: The URLs of the 'completed' and 'failed' issues.
+    """
+    with DownloadScheduler(downloads_root, workers, requests_per_second, on_file=on_file, cache=cache) as scheduler:
+        for priority, spec in enumerate(specs):
+            try:
+                scheduler.add_title(spec, priority)
+            except (SiteError, requests.RequestException, ValueError) as e:
+                print(f"Could not list the issues of {spec}: {str(e)}")
+        return scheduler.run()
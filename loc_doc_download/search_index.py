@@ -0,0 +1,218 @@
+import argparse
+import sqlite3
+import json
+import os
+import re
+
+# Name of the search index database, stored in the downloads folder next to the publication folders
+INDEX_FILENAME = "search_index.sqlite"
+
+# Matches the text files written by transcribe_pages.py, e.g. page_3_ocr.txt
+TEXT_FILENAME_PATTERN = re.compile(r"^page_(\d+)_ocr\.txt$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    issue_date TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    metadata TEXT,
+    mtime REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5 (
+    title, issue_date, body, metadata,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Weights of the title, issue_date, body and metadata columns when ranking hits
+RANK_WEIGHTS = (2.0, 1.0, 1.0, 0.5)
+
+
+def default_index_path(publication_path):
+    """
+    Gets the default location of the search index for a publication: the downloads folder that contains it.
+
+    Args:
+        publication_path (str): The folder of the publication, e.g. downloads/<title>.
+
+    Returns:
+        str: The path of the index database.
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(publication_path)), INDEX_FILENAME)
+
+
+def flatten_metadata(metadata):
+    """
+    Turns the metadata of an issue into searchable text.
+
+    Args:
+        metadata (dict): The contents of the issue's metadata.json.
+
+    Returns:
+        str: The field names and values, one field per line.
+    """
+    lines = []
+    for key, value in metadata.items():
+        if isinstance(value, list):
+            value = "; ".join(str(item) for item in value)
+        lines.append(f"{key}: {value}")
+    return "\n".join(lines)
+
+
+class SearchIndex:
+    """
+    Full-text index of transcribed pages, backed by SQLite FTS5.
+
+    Args:
+        path (str): The path of the index database. It is created if it does not exist.
+    Comments:
+        Each page is indexed with the title and issue date of its folder, its page number, its text,
+        and the fields of its issue's metadata.json. Pages are re-indexed only when their text file changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self.metadata_cache = {}
+
+    def read_issue_metadata(self, issue_path):
+        if issue_path not in self.metadata_cache:
+            metadata = {}
+            metadata_path = os.path.join(issue_path, "metadata.json")
+            if os.path.exists(metadata_path):
+                try:
+                    with open(metadata_path, encoding="utf-8") as f:
+                        metadata = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Could not read {metadata_path}: {str(e)}")
+            self.metadata_cache[issue_path] = metadata
+        return self.metadata_cache[issue_path]
+
+    def update_page(self, text_path):
+        """
+        Indexes a transcribed page, unless it is already indexed and unchanged.
+
+        Args:
+            text_path (str): The path of the page's _ocr.txt file, inside <publication>/<issue date>/.
+
+        Returns:
+            bool: True if the page was (re-)indexed, False if it was up to date or is not a page text file.
+        """
+        match = TEXT_FILENAME_PATTERN.match(os.path.basename(text_path))
+        if not match or not os.path.exists(text_path):
+            return False
+
+        text_path = os.path.abspath(text_path)
+        mtime = os.path.getmtime(text_path)
+        row = self.connection.execute("SELECT id, mtime FROM documents WHERE path = ?", (text_path,)).fetchone()
+        if row and row[1] >= mtime:
+            return False
+
+        issue_path = os.path.dirname(text_path)
+        issue_date = os.path.basename(issue_path)
+        title = os.path.basename(os.path.dirname(issue_path))
+        metadata = self.read_issue_metadata(issue_path)
+        with open(text_path, encoding="utf-8") as f:
+            body = f.read()
+
+        with self.connection:
+            if row:
+                self.connection.execute("DELETE FROM documents_fts WHERE rowid = ?", (row[0],))
+                self.connection.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+            cursor = self.connection.execute(
+                "INSERT INTO documents (path, title, issue_date, page, metadata, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+                (text_path, title, issue_date, int(match.group(1)), json.dumps(metadata, ensure_ascii=False), mtime),
+            )
+            self.connection.execute(
+                "INSERT INTO documents_fts (rowid, title, issue_date, body, metadata) VALUES (?, ?, ?, ?, ?)",
+                (cursor.lastrowid, title, issue_date, body, flatten_metadata(metadata)),
+            )
+        return True
+
+    def update_publication(self, publication_path):
+        """
+        Indexes every new or changed page of a publication.
+
+        Args:
+            publication_path (str): The folder of the publication, containing one folder per issue.
+
+        Returns:
+            int: The number of pages (re-)indexed.
+        """
+        updated = 0
+        for issue_folder in sorted(os.listdir(publication_path)):
+            issue_path = os.path.join(publication_path, issue_folder)
+            if os.path.isdir(issue_path):
+                self.metadata_cache.pop(os.path.abspath(issue_path), None)
+                for filename in sorted(os.listdir(issue_path)):
+                    if TEXT_FILENAME_PATTERN.match(filename) and self.update_page(os.path.join(issue_path, filename)):
+                        updated += 1
+        return updated
+
+    def search(self, query, limit=20, title=None):
+        """
+        Searches the indexed pages.
+
+        Args:
+            query (str): An FTS5 query, e.g. 'railroad', '"cotton crop"' or 'rugby AND school'.
+            limit (int, optional): The maximum number of hits. Defaults to 20.
+            title (str, optional): Only return pages of titles containing this text. Defaults to None.
+
+        Returns:
+            list: The hits, best first, as dicts with title, issue_date, page, path, snippet and rank.
+
+        Raises:
+            sqlite3.OperationalError: If the query is not valid FTS5 syntax.
+        """
+        sql = (
+            "SELECT d.title, d.issue_date, d.page, d.path, "
+            "snippet(documents_fts, 2, '[', ']', ' ... ', 12), bm25(documents_fts, ?, ?, ?, ?) AS rank "
+            "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+            "WHERE documents_fts MATCH ?"
+        )
+        params = [*RANK_WEIGHTS, query]
+        if title:
+            sql += " AND d.title LIKE ?"
+            params.append(f"%{title}%")
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        columns = ("title", "issue_date", "page", "path", "snippet", "rank")
+        return [dict(zip(columns, row)) for row in self.connection.execute(sql, params)]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the transcribed pages.")
+    parser.add_argument("query", help="FTS5 query, e.g. 'railroad' or '\"cotton crop\"'")
+    parser.add_argument("--index", default=os.path.join("downloads", INDEX_FILENAME), help="Path of the search index")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of hits")
+    parser.add_argument("--title", help="Only search titles containing this text")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.index):
+        print(f"Error: {args.index} does not exist. Run `loc-doc-download transcribe` first.")
+        raise SystemExit(1)
+
+    with SearchIndex(args.index) as index:
+        try:
+            hits = index.search(args.query, args.limit, args.title)
+        except sqlite3.OperationalError as e:
+            print(f"Invalid query: {str(e)}")
+            raise SystemExit(1)
+
+    for hit in hits:
+        snippet = " ".join(hit["snippet"].split())
+        print(f"{hit['title']} - {hit['issue_date']} - page {hit['page']}\n    {snippet}\n    {hit['path']}")
+    print(f"{len(hits)} hits")
@@ -0,0 +1,136 @@
+from contextlib import contextmanager
+import threading
+import json
+import time
+import os
+
+# Set this environment variable to a file path to record stage timings of the download scripts as JSON lines
+TIMINGS_PATH_VARIABLE = "LOC_DOC_TIMINGS"
+
+
+class StageTimer:
+    """
+    Records how long each stage of a run takes, and how many pages and bytes it downloads.
+
+    Args:
+        output_path (str, optional): A file to which every timed stage is appended as a JSON line. Defaults to None.
+    Comments:
+        Each JSON line has the stage name, its start time (seconds since the epoch), its duration in seconds,
+        the thread that ran it and any extra fields passed to stage(), e.g.
+        {"stage": "pdf_fetch", "start": 1700000000.12, "seconds": 0.84, "thread": "fetcher_0", "page": "3"}.
+        Totals per stage are kept in memory for summary(). The timer may be shared between threads.
+    """
+
+    def __init__(self, output_path=None):
+        self.lock = threading.Lock()
+        self.output = None
+        self.reset(output_path)
+
+    def reset(self, output_path=None):
+        """
+        Clears the recorded timings and starts a new run.
+
+        Args:
+            output_path (str, optional): A file to which timed stages are appended as JSON lines. Defaults to None.
+        """
+        with self.lock:
+            if self.output:
+                self.output.close()
+            self.output = open(output_path, "a", encoding="utf-8") if output_path else None
+        self.restart()
+
+    def restart(self):
+        """
+        Clears the recorded timings and starts a new run, still appending to the same output file.
+        The download scripts call it when they start, so each run prints its own summary.
+        """
+        with self.lock:
+            self.start_time = time.monotonic()
+            self.stages = {}
+            self.pages = 0
+            self.bytes = 0
+
+    def write(self, record):
+        with self.lock:
+            if self.output:
+                self.output.write(json.dumps(record) + "\n")
+                self.output.flush()
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """
+        Times a stage of the run.
+
+        Args:
+            name (str): The name of the stage, e.g. 'navigation', 'pdf_fetch' or 'completion_wait'.
+            **fields: Extra fields written with the timing, e.g. the page number.
+        """
+        start = time.time()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            seconds = time.monotonic() - started
+            with self.lock:
+                count, total = self.stages.get(name, (0, 0.0))
+                self.stages[name] = (count + 1, total + seconds)
+            self.write({"stage": name, "start": round(start, 3), "seconds": round(seconds, 4),
+                        "thread": threading.current_thread().name, **fields})
+
+    def record_download(self, size, page=False):
+        """
+        Counts a downloaded file.
+
+        Args:
+            size (int): The size of the file in bytes.
+            page (bool, optional): Whether the file completes a page (its PDF). Defaults to False.
+        """
+        with self.lock:
+            self.bytes += size
+            if page:
+                self.pages += 1
+
+    def summary(self):
+        """
+        Summarizes the run so far.
+
+        Returns:
+            dict: The elapsed time, pages and bytes downloaded, their rates, and the count, total and mean duration of each stage.
+        """
+        with self.lock:
+            elapsed = time.monotonic() - self.start_time
+            stages = {
+                name: {"count": count, "total_seconds": round(total, 3), "mean_seconds": round(total / count, 4)}
+                for name, (count, total) in sorted(self.stages.items(), key=lambda item: -item[1][1])
+            }
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "pages": self.pages,
+                "bytes": self.bytes,
+                "pages_per_second": round(self.pages / elapsed, 3) if elapsed else 0.0,
+                "bytes_per_second": round(self.bytes / elapsed, 1) if elapsed else 0.0,
+                "stages": stages,
+            }
+
+    def print_summary(self):
+        """
+        Prints the summary of the run, and writes it as a JSON line with stage 'summary'.
+        """
+        summary = self.summary()
+        self.write({"stage": "summary", **summary})
+
+        print(f"{summary['pages']} pages, {summary['bytes'] / 1e6:.1f} MB in {summary['elapsed_seconds']:.1f}s "
+              f"({summary['pages_per_second']:.2f} pages/s, {summary['bytes_per_second'] / 1e6:.2f} MB/s)")
+        for name, totals in summary["stages"].items():
+            print(f"  {name:<18} {totals['count']:>6} x {totals['mean_seconds']:>8.3f}s = {totals['total_seconds']:>9.1f}s")
+
+
+# Timer shared by the download scripts
+timer = StageTimer(os.environ.get(TIMINGS_PATH_VARIABLE))
+
+
+def stage(name, **fields):
+    """
+    Times a stage of the run with the shared timer. See StageTimer.stage.
+    """
+    return timer.stage(name, **fields)
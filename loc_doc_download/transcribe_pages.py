@@ -0,0 +1,435 @@
+import os
+import json
+import tempfile
+import xml.etree.ElementTree as ET
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+from .search_index import SearchIndex, default_index_path
+from .layout import reading_order
+
+# Path to the directory containing the publication issues
+pub_path = "downloads/The Rugbeian and District Reporter (Rugby, Tenn.) 1882 to 1883 (25)"
+
+# Namespace of the ALTO XML files served by loc.gov
+ALTO_NAMESPACE = "http://www.loc.gov/standards/alto/ns-v2#"
+
+# Resolution at which pages are rasterized for Tesseract, which is tuned for 300 dpi scans
+OCR_DPI = 300
+
+# Pages whose ALTO mean word confidence (WC, from 0 to 1) is below this are transcribed again with Tesseract
+MIN_CONFIDENCE = 0.5
+
+# Tesseract language of the OCR fallback
+OCR_LANGUAGE = "eng"
+
+# Number of pages a Tesseract worker process handles before it is replaced, so that its memory use cannot creep up
+OCR_PAGES_PER_WORKER = 50
+
+# Obtain OCR data for a pdf file.
+# With reorder set, the blocks are written in the reading order reconstructed from their coordinates (see layout.py).
+# Only the ALTO file is read: the text does not depend on the page geometry, so the PDF is neither opened nor rendered.
+def process_pdf(pdf_path, alto_path, reorder=True):
+    # Extract text content using ALTO XML structure and write it to the text file, recording where it came from
+    confidence = write_text_from_alto(alto_path, get_text_path(pdf_path), reorder=reorder)
+    write_text_source(pdf_path, "alto", confidence=confidence)
+
+# Rasterize a PDF page to a grayscale image file in output_folder and return its path.
+# The image is written by pdftoppm and never loaded into this process.
+def render_page_to_file(pdf_path, output_folder, dpi=OCR_DPI, page=1):
+    from pdf2image import convert_from_path
+    return convert_from_path(pdf_path, dpi=dpi, first_page=page, last_page=page, grayscale=True,
+                             output_folder=output_folder, paths_only=True)[0]
+
+# Strip the namespace from an element tag
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+# Format the content of an ALTO String element according to its style
+def format_alto_string(string):
+    content = string.get('CONTENT') or ""
+    style = string.get('STYLEREFS')
+    # Apply style formatting if needed
+    if style and 'I' in style:
+        content = f"*{content}*"  # Italics
+    elif style and 'M' in style:
+        content = content.upper()  # Small caps
+    return content
+
+# Add the word confidence (WC) of an ALTO String element to a [sum, count] pair
+def add_word_confidence(confidence, string):
+    try:
+        confidence[0] += float(string.get('WC'))
+        confidence[1] += 1
+    except (TypeError, ValueError):
+        pass
+
+# Get the mean of a [sum, count] pair of word confidences, or None if no word had one
+def mean_confidence(confidence):
+    return round(confidence[0] / confidence[1], 4) if confidence[1] else None
+
+# Stream the text of an ALTO file, yielding the text of one TextBlock at a time.
+# Elements are removed from the tree as soon as they have been read, so memory use does not grow with the file size.
+# If confidence is a [sum, count] pair, the word confidences are added to it.
+def iter_alto_blocks(alto_path, confidence=None):
+    parents = []
+    line_words = []
+    block_lines = []
+
+    for event, element in ET.iterparse(alto_path, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+
+        parents.pop()
+        tag = local_name(element.tag)
+        if tag == "String":
+            line_words.append(format_alto_string(element))
+            if confidence is not None:
+                add_word_confidence(confidence, element)
+        elif tag == "TextLine":
+            block_lines.append(" ".join(line_words).strip() + "\n")
+            line_words = []
+        elif tag == "TextBlock":
+            yield "".join(block_lines) + "\n"
+            block_lines = []
+        else:
+            continue
+
+        # Drop the element now that its content has been used
+        element.clear()
+        if tag == "TextBlock" and parents:
+            parents[-1].remove(element)
+
+# Read the box of an ALTO element (HPOS, VPOS, WIDTH, HEIGHT), with NaN for missing values
+def read_box(element):
+    box = []
+    for name in ("HPOS", "VPOS", "WIDTH", "HEIGHT"):
+        try:
+            box.append(float(element.get(name)))
+        except (TypeError, ValueError):
+            box.append(float("nan"))
+    return box
+
+# Read the text and coordinates of the blocks and lines of an ALTO file, for reordering.
+# Returns a dict with the page 'width', the 'blocks' and 'lines' boxes (HPOS, VPOS, WIDTH, HEIGHT) and the text of each block.
+# The file is streamed as in iter_alto_blocks; only the block texts and coordinates are kept.
+# If confidence is a [sum, count] pair, the word confidences are added to it.
+def read_alto_layout(alto_path, confidence=None):
+    layout = {"width": None, "blocks": [], "lines": [], "texts": []}
+    line_words = []
+    block_lines = []
+
+    for event, element in ET.iterparse(alto_path, events=("start", "end")):
+        tag = local_name(element.tag)
+        if event == "start":
+            if tag == "Page":
+                layout["width"] = read_box(element)[2]
+            continue
+
+        if tag == "String":
+            line_words.append(format_alto_string(element))
+            if confidence is not None:
+                add_word_confidence(confidence, element)
+        elif tag == "TextLine":
+            block_lines.append(" ".join(line_words).strip() + "\n")
+            layout["lines"].append(read_box(element))
+            line_words = []
+        elif tag == "TextBlock":
+            layout["texts"].append("".join(block_lines) + "\n")
+            layout["blocks"].append(read_box(element))
+            block_lines = []
+        else:
+            continue
+        element.clear()
+
+    return layout
+
+# Write the text of an ALTO file to a text file.
+# By default blocks are written in reading order; with reorder=False they are streamed one TextBlock at a time in document order.
+# Returns the mean word confidence (WC) of the page, or None if its words have none.
+def write_text_from_alto(alto_path, output_path, reorder=True):
+    confidence = [0.0, 0]
+    if reorder:
+        layout = read_alto_layout(alto_path, confidence)
+        block_texts = [layout["texts"][i] for i in reading_order(layout["blocks"], layout["lines"], layout["width"])]
+    else:
+        block_texts = iter_alto_blocks(alto_path, confidence)
+
+    write_text(output_path, block_texts)
+    return mean_confidence(confidence)
+
+# Write text to a file through a temporary file, so that readers never see a partial file
+def write_text(output_path, parts):
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for part in parts:
+            f.write(part)
+    os.replace(temp_path, output_path)
+
+# Read the mean word confidence (WC) of an ALTO file, or None if its words have none
+def read_alto_confidence(alto_path):
+    confidence = [0.0, 0]
+    for block_text in iter_alto_blocks(alto_path, confidence):
+        pass
+    return mean_confidence(confidence)
+
+# Extract text content from a parsed ALTO XML structure, in reading order unless reorder is False
+def extract_text_from_alto(root, scale_factor, reorder=True):
+    namespace = {'alto': ALTO_NAMESPACE}
+    blocks = []
+    block_boxes = []
+    line_boxes = []
+
+    for text_block in root.findall(".//alto:TextBlock", namespace):
+        lines = []
+        for text_line in text_block.findall(".//alto:TextLine", namespace):
+            words = [format_alto_string(string) for string in text_line.findall(".//alto:String", namespace)]
+            lines.append(" ".join(words).strip() + "\n")
+            line_boxes.append(read_box(text_line))
+        blocks.append("".join(lines) + "\n")
+        block_boxes.append(read_box(text_block))
+
+    if reorder:
+        page = root.find(".//alto:Page", namespace)
+        width = read_box(page)[2] if page is not None else None
+        blocks = [blocks[i] for i in reading_order(block_boxes, line_boxes, width)]
+    return "".join(blocks)
+
+# Get the path of the text file a page is transcribed to
+def get_text_path(pdf_path):
+    return pdf_path.replace(".pdf", "_ocr.txt")
+
+# Get the path of the file recording where the text of a page came from, e.g. page_3_source.json
+def get_source_path(pdf_path):
+    return pdf_path.replace(".pdf", "_source.json")
+
+# Record where the text of a page came from: 'alto' (with the mean word confidence) or 'tesseract' (with the
+# reason, resolution and language). The text file itself keeps the same format whatever its source.
+def write_text_source(pdf_path, source, **details):
+    write_text(get_source_path(pdf_path), [json.dumps({"source": source, **details})])
+
+# Read the record written by write_text_source, or an empty dict if the page has none
+def read_text_source(pdf_path):
+    try:
+        with open(get_source_path(pdf_path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# Check whether the text file of a page is newer than both its PDF and its ALTO file (if it has one)
+def is_transcription_current(pdf_path, alto_path):
+    text_path = get_text_path(pdf_path)
+    if not os.path.exists(text_path):
+        return False
+    text_mtime = os.path.getmtime(text_path)
+    return text_mtime > os.path.getmtime(pdf_path) and (not os.path.exists(alto_path) or text_mtime > os.path.getmtime(alto_path))
+
+# List the (pdf_path, alto_path) of the pages of a publication that need to be transcribed.
+# Pages whose text file is up to date are skipped unless force is set.
+def find_pages_to_transcribe(publication_path, force=False):
+    jobs = []
+    up_to_date = 0
+
+    for issue_folder in sorted(os.listdir(publication_path)):
+        issue_path = os.path.join(publication_path, issue_folder)
+
+        if os.path.isdir(issue_path):
+            for filename in sorted(os.listdir(issue_path)):
+                if filename.endswith(".pdf"):
+                    pdf_path = os.path.join(issue_path, filename)
+                    alto_path = os.path.join(issue_path, filename.replace(".pdf", ".xml"))
+
+                    if not os.path.exists(alto_path):
+                        print(f"ALTO XML not found for {filename} in {issue_folder}")
+                    elif not force and is_transcription_current(pdf_path, alto_path):
+                        up_to_date += 1
+                    else:
+                        jobs.append((pdf_path, alto_path))
+
+    if up_to_date:
+        print(f"Skipping {up_to_date} pages that are already transcribed")
+    return jobs
+
+# Transcribe one page. Runs in a worker process; returns the number of ALTO bytes processed.
+def transcribe_page(pdf_path, alto_path, reorder=True):
+    process_pdf(pdf_path, alto_path, reorder)
+    return os.path.getsize(alto_path)
+
+# Get the number of CPU cores available to this process
+def get_available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+# Transcribe a list of (pdf_path, alto_path) pages across a pool of worker processes, reporting progress and throughput.
+# Each transcribed page is added to the search index, if one is given.
+def transcribe_jobs(jobs, publication_path, workers=None, index=None, reorder=True):
+    workers = min(workers or get_available_cores(), len(jobs))
+    print(f"Transcribing {len(jobs)} pages with {workers} workers")
+
+    start_time = time.monotonic()
+    done = failed = total_bytes = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(transcribe_page, pdf_path, alto_path, reorder): pdf_path for pdf_path, alto_path in jobs}
+
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            try:
+                total_bytes += future.result()
+                done += 1
+                if index:
+                    index.update_page(get_text_path(pdf_path))
+            except Exception as e:
+                failed += 1
+                print(f"Error transcribing {pdf_path}: {str(e)}")
+
+            elapsed = time.monotonic() - start_time
+            print(f"[{done + failed}/{len(jobs)}] {os.path.relpath(pdf_path, publication_path)} "
+                  f"({done / elapsed:.1f} pages/s, {total_bytes / elapsed / 1e6:.1f} MB/s of ALTO)")
+
+    elapsed = time.monotonic() - start_time
+    print(f"Transcribed {done} pages in {elapsed:.1f}s ({done / elapsed:.1f} pages/s), {failed} failed")
+
+# Decide whether a page needs the Tesseract fallback. Returns the reason ('no ALTO', 'low confidence 0.31', ...) or None.
+# Pages already transcribed with Tesseract since their files last changed are skipped unless force is set.
+# The confidence of ALTO pages is read from the record written when they were transcribed, or from the ALTO file.
+def get_ocr_reason(pdf_path, alto_path, force=False, min_confidence=MIN_CONFIDENCE):
+    source = read_text_source(pdf_path)
+    current = is_transcription_current(pdf_path, alto_path)
+    if not force and current and source.get("source") == "tesseract":
+        return None
+    if not os.path.exists(alto_path):
+        return "no ALTO"
+
+    if current and source.get("source") == "alto":
+        confidence = source.get("confidence")
+    else:
+        try:
+            confidence = read_alto_confidence(alto_path)
+        except ET.ParseError:
+            return "unreadable ALTO"
+        if current and not source:
+            write_text_source(pdf_path, "alto", confidence=confidence)  # text written before sources were recorded
+
+    if confidence is not None and confidence < min_confidence:
+        return f"low confidence {confidence:.2f}"
+    return None
+
+# List the (pdf_path, reason) of the pages of a publication to transcribe with Tesseract:
+# pages without an ALTO file, and pages whose ALTO mean word confidence is below min_confidence.
+def find_pages_to_ocr(publication_path, force=False, min_confidence=MIN_CONFIDENCE):
+    jobs = []
+
+    for issue_folder in sorted(os.listdir(publication_path)):
+        issue_path = os.path.join(publication_path, issue_folder)
+
+        if os.path.isdir(issue_path):
+            for filename in sorted(os.listdir(issue_path)):
+                if filename.endswith(".pdf"):
+                    pdf_path = os.path.join(issue_path, filename)
+                    reason = get_ocr_reason(pdf_path, pdf_path.replace(".pdf", ".xml"), force, min_confidence)
+                    if reason:
+                        jobs.append((pdf_path, reason))
+
+    return jobs
+
+# Set up a Tesseract worker process. Tesseract is limited to one thread: pages are spread across processes instead.
+def init_ocr_worker():
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+# Transcribe one page with Tesseract. Runs in a worker process; returns the number of words read.
+# The page is rasterized to a temporary grayscale image file that Tesseract reads directly,
+# so at most one page image per worker exists at a time, and never in Python memory.
+def ocr_page(pdf_path, reason, dpi=OCR_DPI, language=OCR_LANGUAGE):
+    import pytesseract  # imported here so that the ALTO transcription does not need Tesseract
+
+    with tempfile.TemporaryDirectory(prefix="ocr-") as folder:
+        image_path = render_page_to_file(pdf_path, folder, dpi)
+        text = pytesseract.image_to_string(image_path, lang=language)
+
+    write_text(get_text_path(pdf_path), [text])
+    write_text_source(pdf_path, "tesseract", reason=reason, dpi=dpi, language=language)
+    return len(text.split())
+
+# Transcribe a list of (pdf_path, reason) pages with Tesseract across a pool of worker processes, reporting progress.
+# At most two pages per worker are queued at a time. Each transcribed page is added to the search index, if one is given.
+def ocr_jobs(jobs, publication_path, workers=None, index=None, dpi=OCR_DPI, language=OCR_LANGUAGE):
+    workers = min(workers or get_available_cores(), len(jobs))
+    print(f"Transcribing {len(jobs)} pages with Tesseract at {dpi} dpi with {workers} workers")
+
+    start_time = time.monotonic()
+    done = failed = total_words = 0
+    pending = iter(jobs)
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_ocr_worker,
+                             max_tasks_per_child=OCR_PAGES_PER_WORKER) as executor:
+        while True:
+            for pdf_path, reason in pending:
+                running[executor.submit(ocr_page, pdf_path, reason, dpi, language)] = pdf_path
+                if len(running) >= 2 * workers:
+                    break
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pdf_path = running.pop(future)
+                try:
+                    total_words += future.result()
+                    done += 1
+                    if index:
+                        index.update_page(get_text_path(pdf_path))
+                except Exception as e:
+                    failed += 1
+                    print(f"Error transcribing {pdf_path} with Tesseract: {str(e)}")
+
+                elapsed = time.monotonic() - start_time
+                print(f"[{done + failed}/{len(jobs)}] {os.path.relpath(pdf_path, publication_path)} "
+                      f"({done / elapsed:.2f} pages/s, {total_words} words)")
+
+    elapsed = time.monotonic() - start_time
+    print(f"Transcribed {done} pages with Tesseract in {elapsed:.1f}s ({done / elapsed:.2f} pages/s), {failed} failed")
+
+# Run transcription for all PDF files in a directory, spreading the pages across a pool of worker processes.
+# The transcribed pages are added to the full-text search index (by default downloads/search_index.sqlite).
+# Set reorder to False to keep the blocks of each page in document order instead of reconstructing the reading order.
+# With ocr set, pages without ALTO or with a mean word confidence below min_confidence are then transcribed with Tesseract,
+# rasterized at ocr_dpi.
+# Raises NotADirectoryError if publication_path is not a directory.
+def extract_all_text_from_alto(publication_path, workers=None, force=False, index_path=None, reorder=True,
+                               ocr=False, ocr_dpi=OCR_DPI, min_confidence=MIN_CONFIDENCE, ocr_language=OCR_LANGUAGE):
+
+    if not os.path.isdir(publication_path):
+        raise NotADirectoryError(f"{publication_path} is not a valid directory.")
+
+    print(f"Processing {publication_path}")
+
+    with SearchIndex(index_path or default_index_path(publication_path)) as index:
+        jobs = find_pages_to_transcribe(publication_path, force)
+        if jobs:
+            transcribe_jobs(jobs, publication_path, workers, index, reorder)
+        else:
+            print("Nothing to transcribe")
+
+        if ocr:
+            ocr_pages = find_pages_to_ocr(publication_path, force, min_confidence)
+            if ocr_pages:
+                ocr_jobs(ocr_pages, publication_path, workers, index, ocr_dpi, ocr_language)
+            else:
+                print("No pages need Tesseract")
+
+        # Catch up on pages transcribed before the index existed, or by other runs
+        indexed = index.update_publication(publication_path)
+        if indexed:
+            print(f"Indexed {indexed} more pages")
+
+
+if __name__ == "__main__":
+    try:
+        extract_all_text_from_alto(pub_path)
+    except NotADirectoryError as e:
+        print(f"Error: {str(e)}")
+        raise SystemExit(1)
@@ -0,0 +1,14 @@
+def sanitize_filename(filename):
+    """
+    Sanitizes a given filename by replacing any invalid characters with underscores.
+
+    Args:
+        filename (str): The filename to be sanitized.
+
+    Returns:
+        str: The sanitized filename.
+    """
+    invalid_chars = '<>:"/\\|?*'  # Invalid characters for a filename
+    for char in invalid_chars:
+        filename = filename.replace(char, '_')  # Replace invalid characters with underscores
+    return filename
@@ -0,0 +1,311 @@
+import xml.etree.ElementTree as ET
+from array import array
+import numpy as np
+import argparse
+import shutil
+import json
+import os
+import re
+
+# Name of the folder holding the word store of an issue, inside the issue folder
+STORE_FOLDER = "words"
+
+# Version of the on-disk format, stored in meta.json
+STORE_VERSION = 1
+
+# Matches the ALTO files written by the downloaders, e.g. page_3.xml
+ALTO_FILENAME_PATTERN = re.compile(r"^page_(\d+)\.xml$")
+
+# Numeric word columns and their types
+WORD_COLUMNS = {
+    "hpos": np.float32,
+    "vpos": np.float32,
+    "width": np.float32,
+    "height": np.float32,
+    "wc": np.float32,
+    "style": np.uint16,
+}
+
+# Offset arrays linking the levels of the page structure (see WordStore)
+OFFSET_ARRAYS = ("string_offsets", "line_offsets", "block_offsets", "page_offsets")
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def build_word_store(issue_path, output_path=None):
+    """
+    Converts the ALTO files of an issue into a compact, memory-mappable word store.
+
+    Args:
+        issue_path (str): The folder of the issue, containing page_N.xml files.
+        output_path (str, optional): The folder of the store. Defaults to <issue_path>/words.
+
+    Returns:
+        str: The folder of the store, or None if the issue has no ALTO files.
+    Comments:
+        The store holds one .npy file per column of the String elements (HPOS, VPOS, WIDTH, HEIGHT, WC and
+        an index into the table of STYLEREFS values), the CONTENT strings as one UTF-8 blob with offsets,
+        and offset arrays mapping pages to blocks, blocks to lines and lines to words.
+        The ALTO files are parsed incrementally, so memory use does not depend on the size of a single file.
+        The store is written to a temporary folder and moved into place, so readers never see a partial store.
+    """
+    pages = sorted(
+        (int(match.group(1)), filename)
+        for filename in os.listdir(issue_path)
+        if (match := ALTO_FILENAME_PATTERN.match(filename))
+    )
+    if not pages:
+        return None
+
+    output_path = output_path or os.path.join(issue_path, STORE_FOLDER)
+    temp_path = output_path + ".tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+
+    columns = {name: array("f") for name in ("hpos", "vpos", "width", "height", "wc")}
+    styles = {"": 0}
+    style_column = array("H")
+    string_offsets = array("q", [0])
+    line_offsets = array("q", [0])
+    block_offsets = array("q", [0])
+    page_offsets = array("q", [0])
+    page_sizes = []
+    string_offset = 0
+
+    with open(os.path.join(temp_path, "strings.bin"), "wb") as strings:
+        for page_number, filename in pages:
+            page_size = [float("nan"), float("nan")]
+            for event, element in ET.iterparse(os.path.join(issue_path, filename), events=("end",)):
+                tag = local_name(element.tag)
+                if tag == "String":
+                    for name in columns:
+                        columns[name].append(parse_number(element.get(name.upper())))
+                    style = element.get("STYLEREFS") or ""
+                    style_column.append(styles.setdefault(style, len(styles)))
+                    content = (element.get("CONTENT") or "").encode("utf-8")
+                    strings.write(content)
+                    string_offset += len(content)
+                    string_offsets.append(string_offset)
+                elif tag == "TextLine":
+                    line_offsets.append(len(style_column))
+                elif tag == "TextBlock":
+                    block_offsets.append(len(line_offsets) - 1)
+                elif tag == "Page":
+                    page_size = [parse_number(element.get("WIDTH")), parse_number(element.get("HEIGHT"))]
+                else:
+                    continue
+                if tag != "Page":
+                    element.clear()
+            page_offsets.append(len(block_offsets) - 1)
+            page_sizes.append(page_size)
+
+    for name, values in columns.items():
+        np.save(os.path.join(temp_path, f"{name}.npy"), np.frombuffer(values, dtype=np.float32))
+    np.save(os.path.join(temp_path, "style.npy"), np.frombuffer(style_column, dtype=np.uint16))
+    for name, values in zip(OFFSET_ARRAYS, (string_offsets, line_offsets, block_offsets, page_offsets)):
+        np.save(os.path.join(temp_path, f"{name}.npy"), np.frombuffer(values, dtype=np.int64))
+
+    meta = {
+        "version": STORE_VERSION,
+        "pages": [page_number for page_number, _ in pages],
+        "page_sizes": page_sizes,
+        "styles": sorted(styles, key=styles.get),
+        "words": len(style_column),
+    }
+    with open(os.path.join(temp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=4)
+
+    shutil.rmtree(output_path, ignore_errors=True)
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+class WordStore:
+    """
+    Read access to a word store built by build_word_store. All arrays are memory-mapped.
+
+    Args:
+        path (str): The folder of the store (usually <issue>/words).
+    Comments:
+        Words, lines, blocks and pages are numbered across the whole issue, starting at 0:
+        - words line_offsets[l]:line_offsets[l + 1] belong to line l,
+        - lines block_offsets[b]:block_offsets[b + 1] belong to block b,
+        - blocks page_offsets[p]:page_offsets[p + 1] belong to the p-th page of meta['pages'].
+        Column slices returned by the reader are views of the mapped files, so nothing is copied
+        until the values are used.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported word store version in {path}: {self.meta.get('version')}")
+
+        self.columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in WORD_COLUMNS}
+        for name in OFFSET_ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        strings_path = os.path.join(path, "strings.bin")
+        self.strings = np.memmap(strings_path, dtype=np.uint8, mode="r") if os.path.getsize(strings_path) else np.zeros(0, np.uint8)
+        self.styles = self.meta["styles"]
+        self.page_numbers = self.meta["pages"]
+
+    def __len__(self):
+        return len(self.columns["style"])
+
+    def page_index(self, page_number):
+        """
+        Gets the position of a page in the store.
+
+        Args:
+            page_number (int): The page number, as in page_N.xml.
+
+        Returns:
+            int: The index of the page.
+
+        Raises:
+            KeyError: If the page is not in the store.
+        """
+        try:
+            return self.page_numbers.index(int(page_number))
+        except ValueError:
+            raise KeyError(f"Page {page_number} is not in {self.path}")
+
+    def content(self, word):
+        """
+        Gets the text of a word.
+
+        Args:
+            word (int): The index of the word.
+
+        Returns:
+            str: The CONTENT of the word.
+        """
+        start, end = self.string_offsets[word], self.string_offsets[word + 1]
+        return self.strings[start:end].tobytes().decode("utf-8")
+
+    def word(self, word):
+        """
+        Gets all fields of a word.
+
+        Args:
+            word (int): The index of the word.
+
+        Returns:
+            dict: The content, hpos, vpos, width, height, wc and style of the word.
+        """
+        fields = {name: column[word].item() for name, column in self.columns.items()}
+        fields["style"] = self.styles[fields["style"]]
+        fields["content"] = self.content(word)
+        return fields
+
+    def word_range(self, level, index):
+        """
+        Gets the range of words of a line, block or page.
+
+        Args:
+            level (str): 'line', 'block' or 'page'.
+            index (int): The index of the line, block or page (for pages, its position in the store, see page_index).
+
+        Returns:
+            tuple: The (start, end) indexes of the words.
+        """
+        if level == "line":
+            return int(self.line_offsets[index]), int(self.line_offsets[index + 1])
+        if level == "block":
+            first_line, last_line = self.block_offsets[index], self.block_offsets[index + 1]
+            return int(self.line_offsets[first_line]), int(self.line_offsets[last_line])
+        if level == "page":
+            first_block, last_block = self.page_offsets[index], self.page_offsets[index + 1]
+            first_line, last_line = self.block_offsets[first_block], self.block_offsets[last_block]
+            return int(self.line_offsets[first_line]), int(self.line_offsets[last_line])
+        raise ValueError(f"Unknown level: {level}")
+
+    def boxes(self, start, end):
+        """
+        Gets the word boxes of a range of words.
+
+        Args:
+            start (int): The index of the first word.
+            end (int): The index after the last word.
+
+        Returns:
+            numpy.ndarray: An (n, 4) array of HPOS, VPOS, WIDTH, HEIGHT.
+        """
+        return np.stack([self.columns[name][start:end] for name in ("hpos", "vpos", "width", "height")], axis=1)
+
+    def text(self, start, end):
+        """
+        Gets the text of a range of words, separated by spaces.
+
+        Args:
+            start (int): The index of the first word.
+            end (int): The index after the last word.
+
+        Returns:
+            str: The text.
+        """
+        return " ".join(self.content(word) for word in range(start, end))
+
+    def page_lines(self, page_number):
+        """
+        Gets the lines of a page.
+
+        Args:
+            page_number (int): The page number, as in page_N.xml.
+
+        Returns:
+            range: The indexes of the lines of the page.
+        """
+        page = self.page_index(page_number)
+        first_block, last_block = self.page_offsets[page], self.page_offsets[page + 1]
+        return range(int(self.block_offsets[first_block]), int(self.block_offsets[last_block]))
+
+    def page_blocks(self, page_number):
+        """
+        Gets the blocks of a page.
+
+        Args:
+            page_number (int): The page number, as in page_N.xml.
+
+        Returns:
+            range: The indexes of the blocks of the page.
+        """
+        page = self.page_index(page_number)
+        return range(int(self.page_offsets[page]), int(self.page_offsets[page + 1]))
+
+
+def build_publication_word_stores(publication_path):
+    """
+    Builds the word store of every issue of a publication.
+
+    Args:
+        publication_path (str): The folder of the publication, containing one folder per issue.
+
+    Returns:
+        int: The number of stores built.
+    """
+    built = 0
+    for issue_folder in sorted(os.listdir(publication_path)):
+        issue_path = os.path.join(publication_path, issue_folder)
+        if os.path.isdir(issue_path) and build_word_store(issue_path):
+            print(f"Built word store for {issue_folder}")
+            built += 1
+    return built
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build compact word stores from the ALTO files of a publication.")
+    parser.add_argument("publication_path", help="Folder of the publication, e.g. downloads/<title>")
+    args = parser.parse_args()
+
+    print(f"Built {build_publication_word_stores(args.publication_path)} word stores")
@@ -0,0 +1,20 @@
+import threading
+
+import pytest
+
+from stand_in import StandInServer
+
+
+@pytest.fixture
+def stand_in():
+    server = StandInServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def base_url(stand_in):
+    return stand_in.url
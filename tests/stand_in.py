@@ -0,0 +1,81 @@
+import os
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Recorded responses, served by the stand-in server with the loc.gov hosts rewritten to its own address
+SITE_HOSTS = ("https://www.loc.gov", "https://tile.loc.gov")
+ISSUE_URL = "https://www.loc.gov/resource/sn84024441/1900-01-05/ed-1/?sp=1&st=image"
+ITEM_PATH = "/item/sn84024441/1900-01-05/ed-1/"
+ALTO_PATH = "/storage-services/service/ndnp/dc/batch_dc_elm_ver01/data/sn84024441/00280654331/1900010501/0002.xml"
+
+
+def read_data(file_name):
+    with open(os.path.join(DATA_DIR, file_name), "rb") as f:
+        return f.read()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Serves the recorded search and item JSON, and the same stand-in PDF and ALTO file for every page.
+    A path listed in the server's failures is answered with the next status code of its list instead, while any are left.
+    """
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        with self.server.lock:
+            self.server.requests[path] += 1
+            failures = self.server.failures.get(path)
+            status = failures.pop(0) if failures else None
+        if status:
+            self.send_error(status)
+            return
+
+        if path == "/collections/chronicling-america/":
+            body, content_type = self.server.rewrite(read_data("search.json")), "application/json"
+        elif path == ITEM_PATH:
+            body, content_type = self.server.rewrite(read_data("item.json")), "application/json"
+        elif path.endswith(".pdf"):
+            body, content_type = read_data("page.pdf"), "application/pdf"
+        elif path.endswith(".xml"):
+            body, content_type = read_data("page.xml"), "text/xml"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    A local stand-in for loc.gov, serving the recorded responses of tests/data on a free port.
+
+    Attributes:
+        url (str): The base URL of the server, to pass as base_url.
+        failures (dict): Status codes to answer instead of the response of a path, e.g. {ALTO_PATH: [503]}.
+        requests (Counter): The number of requests received per path.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.lock = threading.Lock()
+        self.failures = {}
+        self.requests = Counter()
+
+    def rewrite(self, body):
+        for host in SITE_HOSTS:
+            body = body.replace(host.encode(), self.url.encode())
+        return body
+
+    def issue_url(self):
+        return ISSUE_URL.replace("https://www.loc.gov", self.url)
@@ -0,0 +1,50 @@
+import json
+import os
+
+import requests
+
+from loc_doc_download.download_api import (download_newspaper_pages_api, fetch_publication_folder, get_issue_key,
+                                           build_resource_url)
+from loc_doc_download.manifest import Manifest, MANIFEST_FILENAME
+from loc_doc_download.timing import timer
+
+from stand_in import ISSUE_URL, read_data
+
+
+def test_get_issue_key_is_the_item_url():
+    item_url = "https://www.loc.gov/item/sn84024441/1900-01-05/ed-1/"
+    assert get_issue_key(ISSUE_URL) == item_url
+    assert get_issue_key(item_url) == item_url
+    assert get_issue_key(build_resource_url("sn84024441", "1900-01-05", "ed-1")) == item_url
+
+
+def test_download_from_recorded_responses(base_url, tmp_path):
+    start_url = ISSUE_URL.replace("https://www.loc.gov", base_url)
+    download_newspaper_pages_api(start_url, str(tmp_path), base_url=base_url, requests_per_second=100)
+
+    issue_folder = tmp_path / "The evening times. [volume]" / "1900-01-05"
+    assert sorted(os.listdir(issue_folder)) == ["metadata.json", "page_1.pdf", "page_1.xml", "page_2.pdf", "page_2.xml"]
+    assert (issue_folder / "page_2.xml").read_bytes() == read_data("page.xml")
+
+    metadata = json.loads((issue_folder / "metadata.json").read_text(encoding="utf-8"))
+    assert metadata["Newspaper Title"] == "The evening times. [volume]"
+    assert metadata["Number Lccn"] == "sn84024441"
+
+    # The issue before the start date is not downloaded
+    assert os.listdir(tmp_path / "The evening times. [volume]") == ["1900-01-05"]
+
+    # The browser engines record the issue under the same key and write to the same folder
+    with Manifest(str(tmp_path / MANIFEST_FILENAME)) as manifest:
+        assert manifest.is_issue_complete(get_issue_key(start_url))
+    with requests.Session() as session:
+        assert fetch_publication_folder(session, start_url) == "The evening times. [volume]/1900-01-05"
+
+
+def test_each_run_has_its_own_timings(base_url, tmp_path):
+    start_url = ISSUE_URL.replace("https://www.loc.gov", base_url)
+    download_newspaper_pages_api(start_url, str(tmp_path), base_url=base_url, requests_per_second=100)
+    assert timer.summary()["pages"] == 2
+
+    # The second run skips the downloaded issue, and does not count the pages of the first run
+    download_newspaper_pages_api(start_url, str(tmp_path), base_url=base_url, requests_per_second=100)
+    assert timer.summary()["pages"] == 0
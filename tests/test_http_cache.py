@@ -0,0 +1,47 @@
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from loc_doc_download.fetcher import create_session
+from loc_doc_download.http_cache import ResponseCache
+
+# Responses of the stand-in server: path -> (content type, body)
+RESPONSES = {
+    "/item.json": ("application/json", b'{"item": {"date": "1900-01-05"}}'),
+    "/difficulties.html": ("text/html; charset=utf-8", b"<html><body>We are experiencing technical difficulties.</body></html>"),
+    "/broken.json": ("application/json", b'{"item": {"date": '),
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        content_type, body = RESPONSES[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("path, cached", [("/item.json", True), ("/difficulties.html", False), ("/broken.json", False)])
+def test_only_valid_api_responses_are_cached(base_url, tmp_path, path, cached):
+    with ResponseCache(str(tmp_path / "http_cache")) as cache:
+        session = create_session(1, cache)
+        assert session.get(base_url + path).content == RESPONSES[path][1]
+        assert (cache.lookup(base_url + path) is not None) == cached
@@ -0,0 +1,26 @@
+from loc_doc_download.manifest import Manifest
+
+TITLE_URL = "https://www.loc.gov/item/sn84024441/"
+
+
+def issue_url(date, lccn="sn84024441"):
+    return f"https://www.loc.gov/item/{lccn}/{date}/ed-1/"
+
+
+def test_last_incomplete_issue_is_where_the_run_stopped(tmp_path, monkeypatch):
+    clock = iter(range(1, 100))
+    monkeypatch.setattr("loc_doc_download.manifest.time.time", lambda: next(clock))
+
+    with Manifest(str(tmp_path / "manifest.sqlite")) as manifest:
+        assert manifest.last_incomplete_issue(TITLE_URL) is None
+
+        manifest.start_issue(issue_url("1900-01-04"))
+        manifest.finish_issue(issue_url("1900-01-04"), complete=False)
+        manifest.start_issue(issue_url("1900-01-05"))
+        manifest.finish_issue(issue_url("1900-01-05"))
+        manifest.start_issue(issue_url("1900-01-06"))
+        manifest.start_issue(issue_url("1900-01-06", lccn="sn83030214"))
+
+        assert manifest.last_incomplete_issue(TITLE_URL) == issue_url("1900-01-06")
+        assert manifest.last_incomplete_issue() == issue_url("1900-01-06", lccn="sn83030214")
+        assert manifest.last_incomplete_issue("https://www.loc.gov/item/sn96086912/") is None
@@ -0,0 +1,59 @@
+import pytest
+
+from loc_doc_download.download_api import get_issue_key
+from loc_doc_download.scheduler import DownloadScheduler
+
+from stand_in import ITEM_PATH, ALTO_PATH
+
+TITLE = "sn84024441:1900-01-05:1900-01-05"
+
+
+@pytest.fixture
+def scheduler(stand_in, tmp_path):
+    with DownloadScheduler(str(tmp_path), workers=2, requests_per_second=0, max_attempts=3, base_url=stand_in.url) as scheduler:
+        # Retry within milliseconds instead of seconds
+        scheduler.backoff.base_delay = 0.01
+        scheduler.backoff.max_delay = 0.05
+        yield scheduler
+
+
+def test_issue_is_requeued_after_a_server_error(stand_in, scheduler):
+    stand_in.failures[ALTO_PATH] = [503]
+    scheduler.add_title(TITLE)
+    result = scheduler.run()
+
+    issue_url = get_issue_key(stand_in.issue_url())
+    assert result == {"completed": [issue_url], "failed": []}
+    assert stand_in.requests[ALTO_PATH] == 2
+    assert scheduler.manifest.is_issue_complete(issue_url)
+
+
+def test_scheduler_gives_up_after_max_attempts(stand_in, scheduler):
+    stand_in.failures[ALTO_PATH] = [503] * 10
+    scheduler.add_title(TITLE)
+    result = scheduler.run()
+
+    issue_url = get_issue_key(stand_in.issue_url())
+    assert result == {"completed": [], "failed": [issue_url]}
+    assert stand_in.requests[ALTO_PATH] == scheduler.max_attempts
+    assert not scheduler.manifest.is_issue_complete(issue_url)
+
+
+def test_permanent_failure_is_not_retried(stand_in, scheduler):
+    stand_in.failures[ALTO_PATH] = [404] * 10
+    scheduler.add_title(TITLE)
+    result = scheduler.run()
+
+    assert result == {"completed": [], "failed": [get_issue_key(stand_in.issue_url())]}
+    assert stand_in.requests[ALTO_PATH] == 1
+    assert scheduler.backoff.delay == 0
+
+
+def test_issue_of_two_titles_is_downloaded_once(stand_in, scheduler):
+    assert scheduler.add_title(TITLE) == 1
+    # The same issue, as the start of an open-ended range
+    assert scheduler.add_title(stand_in.issue_url()) == 0
+    result = scheduler.run()
+
+    assert result == {"completed": [get_issue_key(stand_in.issue_url())], "failed": []}
+    assert stand_in.requests[ITEM_PATH] == 1